@@ -0,0 +1,222 @@
+"""
+asyncio front end for NatNetClient.
+
+Datagrams are received by loop.create_datagram_endpoint protocols and decoded
+on the event loop by a socketless NatNetClient (same frame layout,
+subscriptions, segments and statistics), so no receive threads are involved
+and closing is immediate:
+
+    async with AsyncNatNetClient({"server_ip": "10.0.0.2", "local_ip": "10.0.0.5"}) as client:
+        client.subscribe(marker_sets=["hand"], blocks=["marker_sets"])
+        print(await client.server_info())
+        async for marker_set in client.marker_sets("hand"):
+            ...
+"""
+
+import asyncio
+import socket
+import time
+from typing import AsyncIterator, Union
+
+from natnetclient_rough import NatNetClient
+
+# How often unicast connections are kept alive, in seconds
+KEEP_ALIVE_INTERVAL = 1.0
+
+# Ends marker_sets() iteration once the client closes
+_CLOSED = object()
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, client: NatNetClient):
+        self.client = client
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        self.client.process_datagram(data, time.perf_counter_ns())
+
+    def error_received(self, exc: Exception) -> None:
+        print(f"ERROR: NatNet socket error occurred:\n{exc!r}")
+
+
+class AsyncNatNetClient(object):
+    """
+    NatNet client driven by an asyncio event loop.
+
+    Settings are NatNetClient's. Marker sets are delivered to every open
+    marker_sets() iterator through a bounded queue per consumer; a consumer
+    that falls behind loses its oldest frames rather than stalling the
+    others. Marker arrays are read-only views into their datagram.
+
+    Attributes:
+        client (NatNetClient): Decoder and state shared with the threaded client
+    """
+
+    def __init__(self, instance_settings: dict = {}):
+        # listeners run inline on the event loop, no dispatch threads
+        self.client = NatNetClient({**instance_settings, "dispatch_queue_size": 0})
+        self.client.markers_listener = self.__publish
+
+        self.__transports = []
+        self.__keep_alive = None
+        self.__consumers = set()
+
+    @property
+    def settings(self) -> dict:
+        return self.client.settings
+
+    def subscribe(self, marker_sets=None, blocks=None) -> None:
+        """See NatNetClient.subscribe()."""
+        self.client.subscribe(marker_sets, blocks)
+
+    def begin_segment(self, name: str) -> None:
+        self.client.begin_segment(name)
+
+    def end_segment(self) -> None:
+        self.client.end_segment()
+
+    def stats(self, segment: bool = False) -> dict:
+        return self.client.stats(segment)
+
+    def running(self) -> bool:
+        return bool(self.__transports)
+
+    async def start(self) -> None:
+        """Open the command and data endpoints and connect to the server."""
+        if self.running():
+            return
+
+        loop = asyncio.get_running_loop()
+        settings = self.client.settings
+
+        command_socket = self.__command_socket()
+        data_socket = self.__data_socket()
+        for sock in (command_socket, data_socket):
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _DatagramProtocol(self.client), sock=sock
+            )
+            self.__transports.append(transport)
+
+        # NatNetClient.request() sends on, and tracks replies for, this socket
+        self.client.command_socket = command_socket
+        self.client.data_socket = data_socket
+        settings["is_locked"] = True
+
+        self.client.server_info = self.client.request(self.client.NAT_CONNECT)
+        if not settings["use_multicast"]:
+            self.__keep_alive = asyncio.create_task(self.__send_keep_alive())
+
+    async def close(self) -> None:
+        """Stop receiving and end every marker_sets() iterator."""
+        if self.__keep_alive is not None:
+            self.__keep_alive.cancel()
+            try:
+                await self.__keep_alive
+            except asyncio.CancelledError:
+                pass
+            self.__keep_alive = None
+
+        for transport in self.__transports:
+            transport.close()
+        self.__transports = []
+
+        self.client.end_segment()
+        for queue in self.__consumers:
+            self.__put(queue, _CLOSED)
+
+        self.client.cancel_request()
+
+        self.client.command_socket = self.client.data_socket = None
+        self.client.settings["is_locked"] = False
+
+    async def __aenter__(self) -> "AsyncNatNetClient":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def server_info(self, timeout: float = 1.0) -> dict:
+        """Wait for the server's reply to NAT_CONNECT."""
+        if self.client.server_info is None:
+            raise RuntimeError("Not started; call start() first.")
+
+        return await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(self.client.server_info)), timeout
+        )
+
+    async def command(self, command_str: str, timeout: float = 1.0) -> Union[int, str]:
+        """Send a NAT_REQUEST command and await the server's reply."""
+        future = self.client.request(self.client.NAT_REQUEST, command_str)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self.client.cancel_request(future)
+            raise TimeoutError(f"No reply to command '{command_str}' within {timeout}s.")
+
+    async def marker_sets(
+        self, label: Union[str, None] = None, maxsize: int = 256
+    ) -> AsyncIterator[dict]:
+        """
+        Iterate over incoming marker sets (all labels if `label` is None).
+
+        Frames are buffered per iterator from the first iteration on;
+        iteration ends when the client closes, and breaking out of the
+        loop or cancelling the consuming task unregisters the iterator.
+        """
+        queue = asyncio.Queue(maxsize)
+        self.__consumers.add(queue)
+        try:
+            while True:
+                marker_set = await queue.get()
+                if marker_set is _CLOSED:
+                    return
+                if label is None or marker_set["label"] == label:
+                    yield marker_set
+        finally:
+            self.__consumers.discard(queue)
+
+    def __publish(self, marker_set: dict) -> None:
+        for queue in self.__consumers:
+            self.__put(queue, marker_set)
+
+    @staticmethod
+    def __put(queue: asyncio.Queue, item) -> None:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(item)
+
+    async def __send_keep_alive(self) -> None:
+        settings = self.client.settings
+        while True:
+            self.client.send_keep_alive(
+                self.client.command_socket, settings["server_ip"], settings["command_port"]
+            )
+            await asyncio.sleep(KEEP_ALIVE_INTERVAL)
+
+    def __command_socket(self) -> socket.socket:
+        settings = self.client.settings
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if settings["use_multicast"]:
+            sock.bind(("", 0))
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        else:
+            sock.bind((settings["local_ip"], 0))
+        sock.setblocking(False)
+        return sock
+
+    def __data_socket(self) -> socket.socket:
+        settings = self.client.settings
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        membership = socket.inet_aton(settings["multicast"]) + socket.inet_aton(
+            settings["local_ip"]
+        )
+        if settings["use_multicast"]:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+            sock.bind((settings["local_ip"], settings["data_port"]))
+        else:
+            # unicast frames arrive on the command socket
+            sock.bind(("", 0))
+        sock.setblocking(False)
+        return sock
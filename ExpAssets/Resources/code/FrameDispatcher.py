@@ -0,0 +1,147 @@
+from collections import deque
+from threading import Condition, Thread
+from typing import Callable
+
+POLICIES = ("block", "drop_oldest", "drop_newest")
+
+
+class FrameDispatcher(object):
+    """
+    Runs listener callbacks on worker threads, fed through a bounded queue.
+
+    The NatNet receive thread only enqueues; what happens when the queue is
+    full is set by the policy:
+
+        block:       wait for space (the receive thread stalls behind consumers)
+        drop_oldest: discard the oldest pending call to make room
+        drop_newest: discard the call being submitted
+
+    Attributes:
+        maxsize (int): Queue capacity
+        policy (str): One of POLICIES
+        workers (int): Number of worker threads; 1 preserves call order
+    """
+
+    def __init__(self, maxsize: int = 1024, policy: str = "drop_oldest", workers: int = 1):
+        """
+        Initialize the dispatcher; call start() to spin up the workers.
+
+        Args:
+            maxsize (int, optional): Queue capacity. Defaults to 1024.
+            policy (str, optional): Full-queue policy, one of POLICIES. Defaults to "drop_oldest".
+            workers (int, optional): Worker threads. Defaults to 1.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Policy must be one of {', '.join(POLICIES)}; got '{policy}'.")
+
+        if maxsize < 1 or workers < 1:
+            raise ValueError("Queue size and worker count must both be positive.")
+
+        self.maxsize = maxsize
+        self.policy = policy
+        self.workers = workers
+
+        self.__queue = deque()
+        self.__cond = Condition()
+        self.__threads = []
+        self.__stop = False
+        self.__busy = 0
+
+        self.__queued = 0
+        self.__dispatched = 0
+        self.__dropped = 0
+        self.__errors = 0
+
+    def start(self) -> None:
+        if self.__threads:
+            return
+
+        self.__stop = False
+        self.__threads = [
+            Thread(target=self.__worker, daemon=True) for _ in range(self.workers)
+        ]
+        for thread in self.__threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Deliver whatever is still queued, then stop the workers."""
+        self.join()
+        with self.__cond:
+            self.__stop = True
+            self.__cond.notify_all()
+
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = []
+
+    def submit(self, listener: Callable, payload: dict) -> bool:
+        """
+        Queue listener(payload) for a worker.
+
+        Returns:
+            bool: False if the call was dropped under the drop_newest policy
+        """
+        with self.__cond:
+            if len(self.__queue) >= self.maxsize:
+                if self.policy == "drop_newest":
+                    self.__dropped += 1
+                    return False
+
+                if self.policy == "drop_oldest":
+                    self.__queue.popleft()
+                    self.__dropped += 1
+
+                else:
+                    while len(self.__queue) >= self.maxsize and not self.__stop:
+                        self.__cond.wait()
+
+            self.__queue.append((listener, payload))
+            self.__queued += 1
+            self.__cond.notify_all()
+
+        return True
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait until every queued call has been delivered; False on timeout."""
+        with self.__cond:
+            return self.__cond.wait_for(
+                lambda: not self.__queue and not self.__busy, timeout
+            )
+
+    def stats(self) -> dict[str, int]:
+        """Snapshot of the dispatch counters."""
+        with self.__cond:
+            return {
+                "queued": self.__queued,
+                "dispatched": self.__dispatched,
+                "dropped": self.__dropped,
+                "errors": self.__errors,
+                "pending": len(self.__queue),
+            }
+
+    def __worker(self) -> None:
+        while True:
+            with self.__cond:
+                self.__cond.wait_for(lambda: self.__queue or self.__stop)
+                if not self.__queue:
+                    return
+
+                listener, payload = self.__queue.popleft()
+                self.__busy += 1
+                # wake a receive thread blocked on a full queue
+                self.__cond.notify_all()
+
+            try:
+                listener(payload)
+            except Exception as e:
+                # a failing listener must not take the worker down with it
+                print(f"ERROR: listener {listener!r} raised:\n{e!r}")
+                errored = True
+            else:
+                errored = False
+
+            with self.__cond:
+                self.__busy -= 1
+                self.__dispatched += 1
+                self.__errors += errored
+                self.__cond.notify_all()
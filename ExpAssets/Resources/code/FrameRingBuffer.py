@@ -0,0 +1,221 @@
+from multiprocessing import resource_tracker, shared_memory
+from typing import Union
+
+import numpy as np
+
+# header slots (int64)
+_WRITE_COUNT = 0
+_CAPACITY = 1
+_MAX_MARKERS = 2
+_HEADER_LEN = 4
+
+
+class FrameRingBuffer(object):
+    """
+    Fixed-capacity, preallocated ring buffer of mocap frames in shared memory.
+
+    Each slot holds a frame number, its receive timestamp (time.perf_counter),
+    the number of markers present, and a (max_markers, 3) block of positions
+    (NaN-padded past the marker count).
+
+    Every frame is written twice, to slot i and slot i + capacity, so the
+    latest N frames (N <= capacity) are always one contiguous slice and can
+    be returned as views without copying.
+
+    There is a single writer (the NatNet data thread) and no lock: a slot is
+    filled first, then the write count is published. Readers in this or any
+    other process (see attach()) may hold views across later writes, which
+    is fine for monitoring; use snapshot() when a consistent copy is needed.
+
+    Attributes:
+        name (str): Name of the backing shared memory block
+        capacity (int): Number of frames retained
+        max_markers (int): Marker slots allocated per frame
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        max_markers: int,
+        name: Union[str, None] = None,
+        create: bool = True,
+    ):
+        """
+        Create (or attach to) a shared frame ring buffer.
+
+        Args:
+            capacity (int): Number of frames to retain.
+            max_markers (int): Maximum markers stored per frame.
+            name (str, optional): Shared memory name; generated if omitted.
+            create (bool, optional): Allocate a new block when True, attach to `name` otherwise.
+        """
+        if create:
+            if capacity < 1 or max_markers < 1:
+                raise ValueError("Capacity and max_markers must both be positive.")
+
+            size = self.__nbytes(capacity, max_markers)
+            self.__shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.__shm = _attach_shared_memory(name)
+            header = np.ndarray((_HEADER_LEN,), dtype=np.int64, buffer=self.__shm.buf)
+            capacity, max_markers = int(header[_CAPACITY]), int(header[_MAX_MARKERS])
+
+        self.__owner = create
+        self.__capacity = capacity
+        self.__max_markers = max_markers
+        self.__map_arrays()
+
+        if create:
+            self.__header[:] = 0
+            self.__header[_CAPACITY] = capacity
+            self.__header[_MAX_MARKERS] = max_markers
+            self.__positions.fill(np.nan)
+
+    @classmethod
+    def attach(cls, name: str) -> "FrameRingBuffer":
+        """Attach to a buffer created by another process."""
+        return cls(0, 0, name=name, create=False)
+
+    @property
+    def name(self) -> str:
+        """Get the shared memory name other processes attach with."""
+        return self.__shm.name
+
+    @property
+    def capacity(self) -> int:
+        """Get the number of frames retained."""
+        return self.__capacity
+
+    @property
+    def max_markers(self) -> int:
+        """Get the number of marker slots per frame."""
+        return self.__max_markers
+
+    @property
+    def write_count(self) -> int:
+        """Get the total number of frames ever written."""
+        return int(self.__header[_WRITE_COUNT])
+
+    def __len__(self) -> int:
+        return min(self.write_count, self.__capacity)
+
+    def write(self, frame_number: int, timestamp: float, markers: np.ndarray) -> None:
+        """
+        Append a frame; called from the single writer thread only.
+
+        Args:
+            frame_number (int): Motive frame number.
+            timestamp (float): Receive time of the packet, from time.perf_counter().
+            markers (np.ndarray): (n, 3) marker positions; truncated to max_markers.
+        """
+        count = self.write_count
+        n = min(len(markers), self.__max_markers)
+
+        for slot in (count % self.__capacity, count % self.__capacity + self.__capacity):
+            self.__frame_numbers[slot] = frame_number
+            self.__timestamps[slot] = timestamp
+            self.__counts[slot] = n
+            self.__positions[slot, :n] = markers[:n]
+            self.__positions[slot, n:] = np.nan
+
+        # publish only once the slot is complete
+        self.__header[_WRITE_COUNT] = count + 1
+
+    def latest(self, num_frames: int = 0) -> dict[str, np.ndarray]:
+        """
+        Get views over the latest frames, oldest first.
+
+        Args:
+            num_frames (int, optional): Frames to return. Defaults to all retained frames.
+
+        Returns:
+            dict: 'frame_number', 'timestamp', 'count' and 'positions' arrays
+        """
+        return self.__slice(self.write_count, num_frames)
+
+    def snapshot(self, num_frames: int = 0) -> dict[str, np.ndarray]:
+        """
+        Copy the latest frames, retrying if the writer laps the copy.
+
+        At most capacity - 1 frames are returned: the oldest retained slot is
+        the next one written, and may be mid-write before it is published.
+
+        Args:
+            num_frames (int, optional): Frames to return. Defaults to all that can be copied.
+
+        Returns:
+            dict: 'frame_number', 'timestamp', 'count' and 'positions' arrays
+        """
+        if num_frames < 0:
+            raise ValueError("Number of frames cannot be negative.")
+
+        limit = self.__capacity - 1
+        if limit < 1:
+            raise ValueError("Snapshots need a capacity of at least 2 frames.")
+        num_frames = limit if num_frames == 0 else min(num_frames, limit)
+
+        while True:
+            count = self.write_count
+            frames = {k: v.copy() for k, v in self.__slice(count, num_frames).items()}
+            # frame j (published or not) lands in the copied slots once
+            # j >= count + capacity - n; the writer is at most at write_count
+            if self.write_count - count < self.__capacity - len(frames["count"]):
+                return frames
+
+    def close(self) -> None:
+        """Release this process's mapping; the creator also frees the block."""
+        self.__header = self.__frame_numbers = self.__timestamps = None
+        self.__counts = self.__positions = None
+        self.__shm.close()
+        if self.__owner:
+            self.__shm.unlink()
+
+    def __slice(self, count: int, num_frames: int) -> dict[str, np.ndarray]:
+        if num_frames < 0:
+            raise ValueError("Number of frames cannot be negative.")
+
+        available = min(count, self.__capacity)
+        num_frames = available if num_frames == 0 else min(num_frames, available)
+
+        stop = (count - 1) % self.__capacity + self.__capacity + 1 if count else 0
+        start = stop - num_frames
+
+        return {
+            "frame_number": self.__frame_numbers[start:stop],
+            "timestamp": self.__timestamps[start:stop],
+            "count": self.__counts[start:stop],
+            "positions": self.__positions[start:stop],
+        }
+
+    def __map_arrays(self) -> None:
+        slots = 2 * self.__capacity
+        buf = self.__shm.buf
+        offset = 0
+
+        def view(shape, dtype):
+            nonlocal offset
+            arr = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+            offset += arr.nbytes
+            return arr
+
+        self.__header = view((_HEADER_LEN,), np.int64)
+        self.__frame_numbers = view((slots,), np.int64)
+        self.__timestamps = view((slots,), np.float64)
+        self.__positions = view((slots, self.__max_markers, 3), np.float32)
+        self.__counts = view((slots,), np.int32)
+
+    @staticmethod
+    def __nbytes(capacity: int, max_markers: int) -> int:
+        slots = 2 * capacity
+        return 8 * _HEADER_LEN + slots * (8 + 8 + 4 + max_markers * 3 * 4)
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    # Attaching must not hand ownership to this process's resource tracker,
+    # which would otherwise unlink the creator's block when we exit.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
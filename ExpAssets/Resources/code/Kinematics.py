@@ -0,0 +1,186 @@
+"""
+Whole-trial kinematics: speed, acceleration and jerk profiles, path length
+and peaks, computed with array operations over a trial or a stacked batch.
+
+Positions are in millimetres (as returned by OptiTracker queries), so
+speeds come out in mm/s, accelerations in mm/s^2 and jerk in mm/s^3.
+
+    tracker = OptiTracker(marker_count=10, data_dir="trial_1_left_target.bin")
+    profile = trial_kinematics(tracker)
+    profile["peak_speed"], profile["peak_speed_time"]
+"""
+
+from typing import List, Tuple, Union
+
+import numpy as np
+from scipy.signal import sosfiltfilt
+
+from OptiTracker import OptiTracker, butter_sos, frame_centroids
+
+# Per-frame magnitudes, and the peak summaries computed for each
+PROFILES = ("speed", "acceleration", "jerk")
+
+
+def resample_centroids(frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce query rows to one centroid per frame on a gap-free frame grid.
+
+    Frames with no markers are filled by linear interpolation, so the result
+    can be differentiated at a fixed sample interval.
+
+    Args:
+        frames (np.ndarray): Rows of frame_number and pos_x/y/z.
+
+    Returns:
+        tuple: (frame numbers, (n, 3) centroid positions)
+    """
+    centroids = frame_centroids(frames)
+    centroids = centroids[~np.isnan(centroids["pos_x"])]
+    if len(centroids) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 3))
+
+    frame_numbers = np.arange(centroids["frame_number"][0], centroids["frame_number"][-1] + 1)
+    positions = np.column_stack(
+        [
+            np.interp(frame_numbers, centroids["frame_number"], centroids[col])
+            for col in ["pos_x", "pos_y", "pos_z"]
+        ]
+    )
+    return frame_numbers, positions
+
+
+def stack_trials(trials: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stack (n_i, 3) position arrays into one (n_trials, max n, 3) batch.
+
+    Shorter trials are padded by holding their last position; kinematics()
+    only reads each trial's first `length` frames, so the padding never
+    affects a trial's profile.
+
+    Returns:
+        tuple: (stacked positions, trial lengths)
+    """
+    lengths = np.array([len(trial) for trial in trials], dtype=np.int64)
+    if np.any(lengths == 0):
+        raise ValueError("Cannot stack an empty trial.")
+
+    index = np.minimum(np.arange(lengths.max()), lengths[:, None] - 1)
+    batch = np.zeros((len(trials), lengths.max(), 3))
+    for i, trial in enumerate(trials):
+        batch[i] = np.asarray(trial, dtype=np.float64)[index[i]]
+
+    return batch, lengths
+
+
+def kinematics(
+    positions: np.ndarray,
+    sample_rate: float,
+    lengths: Union[np.ndarray, None] = None,
+    smooth: bool = True,
+    order: int = 2,
+    cutoff: float = 10,
+) -> dict:
+    """
+    Compute kinematic profiles and summaries for one trial or a batch.
+
+    Args:
+        positions (np.ndarray): (n, 3) positions, or (n_trials, n, 3) from stack_trials().
+        sample_rate (float): Sampling rate in Hz.
+        lengths (np.ndarray, optional): Frames per trial, for padded batches;
+            a trial's results match computing it on its own. Defaults to
+            every trial using all n frames.
+        smooth (bool, optional): Zero-phase low-pass the positions first, as
+            OptiTracker does. Defaults to True.
+        order (int, optional): Butterworth filter order. Defaults to 2.
+        cutoff (float, optional): Butterworth cutoff in Hz. Defaults to 10.
+
+    Returns:
+        dict: speed, acceleration and jerk magnitude profiles (NaN past each
+        trial's length); path_length; and peak_<profile> with peak_<profile>_time
+        in seconds from the first frame. Summaries are scalars for a single
+        trial and (n_trials,) arrays for a batch.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    single = positions.ndim == 2
+    if single:
+        positions = positions[None]
+
+    if positions.ndim != 3 or positions.shape[-1] != 3:
+        raise ValueError("Positions must be shaped (n, 3) or (n_trials, n, 3).")
+
+    n_trials, n_frames, _ = positions.shape
+    if n_frames < 2:
+        raise ValueError("Kinematics need at least two frames per trial.")
+
+    if lengths is None:
+        lengths = np.full(n_trials, n_frames)
+    lengths = np.asarray(lengths)
+    if np.any(lengths < 2) or np.any(lengths > n_frames):
+        raise ValueError(f"Trial lengths must be between 2 and {n_frames} frames.")
+
+    dt = 1.0 / sample_rate
+    results = {"path_length": np.zeros(n_trials)}
+    for name in PROFILES:
+        results[name] = np.full((n_trials, n_frames), np.nan)
+        results[f"peak_{name}"] = np.zeros(n_trials)
+        results[f"peak_{name}_time"] = np.zeros(n_trials)
+
+    # each trial is filtered and differentiated over its own frames only, so
+    # its profile does not depend on the batch; equal lengths share one pass
+    for length in np.unique(lengths):
+        rows = np.flatnonzero(lengths == length)
+        trials = positions[rows, :length]
+
+        if smooth:
+            sos = butter_sos(order, cutoff, "low", sample_rate)
+            # sosfiltfilt's default padding, shortened for very short trials
+            padlen = min(3 * (2 * len(sos) + 1), length - 1)
+            trials = sosfiltfilt(sos, trials, axis=1, padlen=padlen)
+
+        velocity = np.gradient(trials, dt, axis=1)
+        acceleration = np.gradient(velocity, dt, axis=1)
+        jerk = np.gradient(acceleration, dt, axis=1)
+
+        steps = np.linalg.norm(np.diff(trials, axis=1), axis=-1)
+        results["path_length"][rows] = steps.sum(axis=1)
+
+        for name, vectors in zip(PROFILES, (velocity, acceleration, jerk)):
+            magnitude = np.linalg.norm(vectors, axis=-1)
+            peak = np.argmax(magnitude, axis=1)
+
+            results[name][rows, :length] = magnitude
+            results[f"peak_{name}"][rows] = magnitude[np.arange(len(rows)), peak]
+            results[f"peak_{name}_time"][rows] = peak * dt
+
+    if single:
+        results = {
+            name: value[0] if value.ndim > 1 else float(value[0])
+            for name, value in results.items()
+        }
+
+    return results
+
+
+def trial_kinematics(
+    tracker: OptiTracker,
+    start_frame: int = 0,
+    end_frame: int = np.iinfo(np.int32).max,
+    **kwargs,
+) -> dict:
+    """
+    Compute kinematics() over a tracker's data file, by default the whole trial.
+
+    Args:
+        tracker (OptiTracker): Tracker whose data_dir points at the trial file.
+        start_frame (int, optional): First frame to include. Defaults to the first.
+        end_frame (int, optional): Last frame to include. Defaults to the last.
+        **kwargs: Passed on to kinematics().
+
+    Returns:
+        dict: As kinematics(), plus the frame_numbers the profiles are sampled at
+    """
+    frame_numbers, positions = resample_centroids(tracker.window(start_frame, end_frame))
+
+    results = kinematics(positions, tracker.sample_rate, **kwargs)
+    results["frame_numbers"] = frame_numbers
+    return results
@@ -0,0 +1,253 @@
+"""
+NAT_MODELDEF decoding, the per-frame layout it implies, and an on-disk cache.
+
+Motive describes its assets (marker sets, rigid bodies, skeletons, ...) in a
+NAT_MODELDEF reply. Only marker sets and rigid bodies are decoded; the rest
+are skipped using the per-description size NatNet 4.1+ sends. Marker sets
+then have a fixed position in every frame, so FrameLayout lets the client
+slice them out of the marker set block without reading labels:
+
+    descriptions, _ = unpack_descriptions(packet, 4, (4, 1, 0, 0))
+    layout = FrameLayout.from_descriptions(descriptions)
+    layout.marker_sets  # [(label, offset into the block, marker count), ...]
+
+Descriptions are JSON-serializable, so DescriptionCache can keep them
+between sessions, keyed by server version and asset list.
+"""
+
+import json
+import os
+from struct import Struct
+from typing import Sequence, Tuple, Union
+
+_uint32 = Struct("<I")
+_int32 = Struct("<i")
+_vector = Struct("<fff")
+
+# NAT_MODELDEF description types
+MARKER_SET = 0
+RIGID_BODY = 1
+
+
+def _label(bytestream: bytes, offset: int) -> Tuple[str, int]:
+    end = bytestream.index(b"\0", offset)
+    return str(bytestream[offset:end], "utf-8"), end + 1
+
+
+def _unpack_marker_set(bytestream: bytes, offset: int) -> Tuple[dict, int]:
+    name, offset = _label(bytestream, offset)
+    (marker_count,) = _int32.unpack_from(bytestream, offset)
+    offset += 4
+
+    markers = []
+    for _ in range(marker_count):
+        marker, offset = _label(bytestream, offset)
+        markers.append(marker)
+
+    return {"name": name, "markers": markers}, offset
+
+
+def _unpack_rigid_body(
+    bytestream: bytes, offset: int, major: int
+) -> Tuple[dict, int]:
+    name = ""
+    if major >= 2 or major == 0:
+        name, offset = _label(bytestream, offset)
+
+    (rigid_body_id,) = _int32.unpack_from(bytestream, offset)
+    (parent_id,) = _int32.unpack_from(bytestream, offset + 4)
+    position = list(_vector.unpack_from(bytestream, offset + 8))
+    offset += 20
+
+    rigid_body = {
+        "name": name,
+        "id": rigid_body_id,
+        "parent_id": parent_id,
+        "offset": position,
+        "marker_offsets": [],
+        "marker_names": [],
+    }
+    if 0 < major < 3:
+        return rigid_body, offset
+
+    (marker_count,) = _int32.unpack_from(bytestream, offset)
+    offset += 4
+    # all marker offsets, then all active labels, then (4.0+) all marker names
+    rigid_body["marker_offsets"] = [
+        list(_vector.unpack_from(bytestream, offset + 12 * i)) for i in range(marker_count)
+    ]
+    offset += 16 * marker_count
+
+    if major >= 4 or major == 0:
+        for _ in range(marker_count):
+            marker, offset = _label(bytestream, offset)
+            rigid_body["marker_names"].append(marker)
+
+    return rigid_body, offset
+
+
+def unpack_descriptions(
+    bytestream: bytes, offset: int, nat_net_version: Sequence[int]
+) -> Tuple[dict, int]:
+    """
+    Decode the marker set and rigid body descriptions of a NAT_MODELDEF packet.
+
+    Before NatNet 4.1 descriptions carry no size, so decoding stops at the
+    first description that is neither a marker set nor a rigid body.
+
+    Args:
+        bytestream (bytes): The packet.
+        offset (int): Where the descriptions start (after the message header).
+        nat_net_version (Sequence[int]): The stream's NatNet version.
+
+    Returns:
+        tuple: (descriptions dict of marker_sets and rigid_bodies lists, end offset)
+
+    Raises:
+        ValueError: If the packet ends mid-description
+    """
+    major, minor = nat_net_version[0], nat_net_version[1]
+    sized = major > 4 or (major == 4 and minor >= 1)
+    descriptions = {"marker_sets": [], "rigid_bodies": []}
+
+    try:
+        (count,) = _uint32.unpack_from(bytestream, offset)
+        offset += 4
+
+        for _ in range(count):
+            (data_type,) = _uint32.unpack_from(bytestream, offset)
+            offset += 4
+            end = None
+            if sized:
+                (size,) = _uint32.unpack_from(bytestream, offset)
+                offset += 4
+                end = offset + size
+
+            if data_type == MARKER_SET:
+                marker_set, offset = _unpack_marker_set(bytestream, offset)
+                descriptions["marker_sets"].append(marker_set)
+            elif data_type == RIGID_BODY:
+                rigid_body, offset = _unpack_rigid_body(bytestream, offset, major)
+                descriptions["rigid_bodies"].append(rigid_body)
+            elif end is None:
+                break
+
+            if end is not None:
+                offset = end
+
+    except Exception as e:
+        raise ValueError(f"Malformed NAT_MODELDEF packet: {e!r}")
+
+    return descriptions, offset
+
+
+class FrameLayout(object):
+    """
+    Fixed byte layout of a frame's marker set block, derived from descriptions.
+
+    A frame follows the layout if its marker set block has the expected
+    count and size and every set's label sits at its expected offset (see
+    matches()); anything else means the asset set has changed and the
+    descriptions are stale.
+
+    Attributes:
+        signature (tuple): ((label, marker count), ...), in stream order
+        marker_sets (list): (label, offset of the markers from the block's
+            first set, marker count) per set
+        count (int): Marker sets per frame
+        size (int): Byte size of the block's sets
+        labels (list): (offset from the block's first set, NUL-terminated label
+            bytes) per set
+    """
+
+    def __init__(self, marker_sets: Sequence[Tuple[str, int]]):
+        self.signature = tuple((label, int(n_markers)) for label, n_markers in marker_sets)
+        self.marker_sets = []
+        self.labels = []
+
+        offset = 0
+        for label, n_markers in self.signature:
+            # NUL-terminated label, then the marker count
+            tag = label.encode("utf-8") + b"\0"
+            self.labels.append((offset, tag))
+            offset += len(tag) + 4
+            self.marker_sets.append((label, offset, n_markers))
+            offset += 12 * n_markers
+
+        self.count = len(self.signature)
+        self.size = offset
+
+    @classmethod
+    def from_descriptions(cls, descriptions: dict) -> "FrameLayout":
+        return cls([(ms["name"], len(ms["markers"])) for ms in descriptions["marker_sets"]])
+
+    def matches(self, parser, count: int, size: int) -> bool:
+        """
+        Whether a marker set block follows the layout.
+
+        Besides the block's count and size, each set's label is compared in
+        place, so sets that trade marker counts or are renamed to labels of
+        the same length are caught.
+
+        Args:
+            parser (MotiveStreamDecoder): Positioned at the block's first set.
+            count (int): The block's marker set count.
+            size (int): The block's byte size.
+        """
+        if count != self.count or size != self.size:
+            return False
+
+        start = parser.tell()
+        for offset, tag in self.labels:
+            if not parser.startswith(tag, start + offset):
+                return False
+        return True
+
+
+class DescriptionCache(object):
+    """
+    Descriptions stored in a JSON file, keyed by server version and asset list.
+
+    Attributes:
+        path (str): The cache file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__entries = None
+
+    @staticmethod
+    def key(server_version: Sequence[int], signature: Sequence[Tuple[str, int]]) -> str:
+        version = ".".join(str(part) for part in server_version)
+        assets = ";".join(f"{label}:{n_markers}" for label, n_markers in signature)
+        return f"{version}|{assets}"
+
+    def get(
+        self, server_version: Sequence[int], signature: Sequence[Tuple[str, int]]
+    ) -> Union[dict, None]:
+        """Get cached descriptions for a server version and frame signature, if any."""
+        return self.__load().get(self.key(server_version, signature))
+
+    def put(self, server_version: Sequence[int], descriptions: dict) -> None:
+        """Store descriptions under their own signature and rewrite the file."""
+        signature = FrameLayout.from_descriptions(descriptions).signature
+        entries = self.__load()
+        entries[self.key(server_version, signature)] = descriptions
+
+        # written aside and swapped in, so a crash never leaves a truncated cache
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(entries, file)
+        os.replace(temp_path, self.path)
+
+    def __load(self) -> dict:
+        if self.__entries is None:
+            self.__entries = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path) as file:
+                        self.__entries = json.load(file)
+                except (OSError, ValueError) as e:
+                    print(f"WARNING: ignoring unreadable description cache {self.path}: {e!r}")
+
+        return self.__entries
@@ -0,0 +1,94 @@
+"""
+Raw NatNet datagram capture files.
+
+A capture starts with CAPTURE_MAGIC and a little-endian uint16 format
+version, followed by one record per datagram:
+
+    uint64  receive time in ns (time.perf_counter_ns, monotonic)
+    uint32  datagram length in bytes
+    bytes   the datagram exactly as received, message header included
+"""
+
+from struct import Struct
+from threading import Lock
+from typing import Iterator, Tuple
+
+CAPTURE_MAGIC = b"NNCAP"
+CAPTURE_VERSION = 1
+CAPTURE_EXT = ".nncap"
+
+_version = Struct("<H")
+_record = Struct("<QI")
+
+
+class CaptureWriter(object):
+    """
+    Appends received datagrams to a capture file.
+
+    Writes go through a large userspace buffer, so the receive thread only
+    pays for a memcpy per packet; close() flushes the remainder.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1024 * 1024):
+        self.__lock = Lock()
+        self.__file = open(path, "wb", buffering=buffer_size)
+        self.__file.write(CAPTURE_MAGIC + _version.pack(CAPTURE_VERSION))
+        self.__path = path
+        self.__count = 0
+
+    @property
+    def path(self) -> str:
+        """Get the capture file path."""
+        return self.__path
+
+    @property
+    def count(self) -> int:
+        """Get the number of datagrams captured so far."""
+        return self.__count
+
+    def write(self, timestamp_ns: int, datagram: bytes) -> None:
+        with self.__lock:
+            # tolerate the receive thread racing a close()
+            if self.__file is None:
+                return
+            self.__file.write(_record.pack(timestamp_ns, len(datagram)))
+            self.__file.write(datagram)
+            self.__count += 1
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+
+def read_capture(path: str) -> Iterator[Tuple[int, bytes]]:
+    """
+    Iterate over a capture file.
+
+    Yields:
+        tuple: (receive time in ns, datagram bytes)
+
+    Raises:
+        ValueError: If the file is not a capture or uses an unknown version
+    """
+    with open(path, "rb") as file:
+        magic = file.read(len(CAPTURE_MAGIC))
+        if magic != CAPTURE_MAGIC:
+            raise ValueError(f"Not a NatNet capture file: {path}")
+
+        (version,) = _version.unpack(file.read(_version.size))
+        if version != CAPTURE_VERSION:
+            raise ValueError(f"Unsupported capture version {version} in {path}")
+
+        while True:
+            header = file.read(_record.size)
+            if len(header) < _record.size:
+                return
+
+            timestamp_ns, length = _record.unpack(header)
+            datagram = file.read(length)
+            if len(datagram) < length:
+                return  # truncated final record, e.g. capture killed mid-write
+
+            yield timestamp_ns, datagram
@@ -0,0 +1,269 @@
+"""
+Local stand-in for a Motive server.
+
+Answers the NatNet command channel well enough for NatNetClient.startup()
+and streams frames from a capture file, so the client, its listeners and
+OptiTracker can be exercised end to end without Motive or cameras:
+
+    python MotiveStandIn.py replay session.nncap --speed 2
+
+Frames go to every client that has sent NAT_CONNECT (unicast; NatNetClient
+with use_multicast=False receives them on its command socket) and, when a
+multicast group is given, to that group on the data port.
+"""
+
+import argparse
+import socket
+import struct
+import time
+from threading import Lock, Thread
+from typing import Iterable, Tuple, Union
+
+from MotiveCapture import read_capture
+
+NAT_CONNECT = 0
+NAT_SERVERINFO = 1
+NAT_REQUEST = 2
+NAT_RESPONSE = 3
+NAT_REQUEST_MODELDEF = 4
+NAT_MODELDEF = 5
+NAT_REQUEST_FRAMEOFDATA = 6
+NAT_FRAMEOFDATA = 7
+NAT_DISCONNECT = 9
+NAT_KEEPALIVE = 10
+
+_header = struct.Struct("<HH")
+
+# Frame suffix stamps are time.perf_counter_ns() ticks
+CLOCK_FREQUENCY = 1_000_000_000
+
+
+def pack_message(message_id: int, payload: bytes) -> bytes:
+    """Prefix a payload with the NatNet message id / packet size header."""
+    return _header.pack(message_id, len(payload)) + payload
+
+
+class MotiveStandIn(object):
+    """
+    Minimal NatNet server: command responder plus a paced frame sender.
+
+    Attributes:
+        clients (set): Addresses that have sent NAT_CONNECT
+        frames_sent (int): Frames sent since start()
+    """
+
+    def __init__(
+        self,
+        local_ip: str = "127.0.0.1",
+        command_port: int = 1510,
+        data_port: int = 1511,
+        multicast: Union[str, None] = None,
+        application_name: str = "MotiveStandIn",
+        server_version: Tuple[int, int, int, int] = (3, 1, 0, 0),
+        nat_net_version: Tuple[int, int, int, int] = (4, 1, 0, 0),
+    ):
+        self.local_ip = local_ip
+        self.command_port = command_port
+        self.data_port = data_port
+        self.multicast = multicast
+        self.application_name = application_name
+        self.server_version = server_version
+        self.nat_net_version = nat_net_version
+
+        self.clients = set()
+        self.frames_sent = 0
+
+        self.__lock = Lock()
+        self.__stop = False
+        self.__command_socket = None
+        self.__data_socket = None
+        self.__command_thread = None
+
+    def start(self) -> None:
+        self.__stop = False
+
+        self.__command_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.__command_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__command_socket.bind((self.local_ip, self.command_port))
+        self.__command_socket.settimeout(0.2)
+
+        self.__data_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.multicast is not None:
+            self.__data_socket.setsockopt(
+                socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(self.local_ip)
+            )
+            self.__data_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+
+        self.__command_thread = Thread(target=self.__command_thread_function, daemon=True)
+        self.__command_thread.start()
+
+    def stop(self) -> None:
+        self.__stop = True
+        if self.__command_thread is not None:
+            self.__command_thread.join()
+        for sock in (self.__command_socket, self.__data_socket):
+            if sock is not None:
+                sock.close()
+        self.__command_thread = self.__command_socket = self.__data_socket = None
+
+    def wait_for_client(self, timeout: float = 5.0) -> bool:
+        """Block until a client has connected (always True when multicasting)."""
+        deadline = time.perf_counter() + timeout
+        while not self.clients and self.multicast is None:
+            if time.perf_counter() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def send_datagram(self, datagram: bytes) -> None:
+        """Send a complete NatNet message to the multicast group, or else every connected client."""
+        if self.multicast is not None:
+            # multicast clients connect too, but only take frames on their data socket
+            self.__data_socket.sendto(datagram, (self.multicast, self.data_port))
+        else:
+            # unicast clients receive data on the socket they connected from
+            with self.__lock:
+                for client in self.clients:
+                    self.__command_socket.sendto(datagram, client)
+
+        self.frames_sent += 1
+
+    def serve(self, datagrams: Iterable[Tuple[int, bytes]], speed: float = 1.0) -> int:
+        """
+        Send timestamped datagrams, preserving their spacing.
+
+        Args:
+            datagrams (Iterable): (timestamp in ns, datagram) pairs, e.g. from read_capture().
+            speed (float, optional): Playback rate multiplier; 0 sends as fast as possible.
+
+        Returns:
+            int: Number of datagrams sent
+        """
+        sent = 0
+        first = start = None
+
+        for timestamp_ns, datagram in datagrams:
+            if self.__stop:
+                break
+
+            if speed > 0:
+                if first is None:
+                    first, start = timestamp_ns, time.perf_counter()
+                due = start + (timestamp_ns - first) / 1e9 / speed
+                _sleep_until(due)
+
+            self.send_datagram(datagram)
+            sent += 1
+
+        return sent
+
+    def replay(self, path: str, speed: float = 1.0) -> int:
+        """Serve the frame datagrams from a capture file (see MotiveCapture)."""
+        frames = (
+            (t, d)
+            for t, d in read_capture(path)
+            if _header.unpack_from(d)[0] == NAT_FRAMEOFDATA
+        )
+        return self.serve(frames, speed)
+
+    def server_info(self) -> bytes:
+        name = self.application_name.encode("utf-8")[:255]
+        return pack_message(
+            NAT_SERVERINFO,
+            name.ljust(256, b"\0")
+            + bytes(self.server_version)
+            + bytes(self.nat_net_version)
+            + struct.pack("<Q", CLOCK_FREQUENCY),
+        )
+
+    def handle_request(self, message_id: int, payload: bytes, address: tuple) -> Union[bytes, None]:
+        """Build the reply to a client request; None sends nothing."""
+        if message_id == NAT_CONNECT:
+            with self.__lock:
+                self.clients.add(address)
+            return self.server_info()
+
+        if message_id == NAT_DISCONNECT:
+            with self.__lock:
+                self.clients.discard(address)
+            return None
+
+        if message_id == NAT_REQUEST:
+            command = payload.partition(b"\0")[0].decode("utf-8")
+            if command.startswith("Bitstream"):
+                major, minor = self.nat_net_version[:2]
+                return pack_message(NAT_RESPONSE, f"Bitstream,{major}.{minor}\0".encode("utf-8"))
+            return pack_message(NAT_RESPONSE, struct.pack("<i", 0))
+
+        # keep-alives, frame and model requests need no reply here
+        return None
+
+    def __command_thread_function(self) -> None:
+        while not self.__stop:
+            try:
+                request, address = self.__command_socket.recvfrom(64 * 1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+
+            if len(request) < _header.size:
+                continue
+
+            message_id, _ = _header.unpack_from(request)
+            reply = self.handle_request(message_id, request[_header.size :], address)
+            if reply is not None:
+                self.__command_socket.sendto(reply, address)
+
+
+def _sleep_until(due: float) -> None:
+    # sleep coarsely, then spin for the last millisecond to keep pacing tight
+    remaining = due - time.perf_counter()
+    if remaining > 0.002:
+        time.sleep(remaining - 0.001)
+    while time.perf_counter() < due:
+        pass
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--local-ip", default="127.0.0.1")
+    parser.add_argument("--command-port", type=int, default=1510)
+    parser.add_argument("--data-port", type=int, default=1511)
+    parser.add_argument("--multicast", default=None, help="e.g. 239.255.42.99")
+    parser.add_argument(
+        "--wait", type=float, default=30.0, help="seconds to wait for a client to connect"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay = commands.add_parser("replay", help="stream a capture file")
+    replay.add_argument("capture")
+    replay.add_argument(
+        "--speed", type=float, default=1.0, help="playback multiplier; 0 = as fast as possible"
+    )
+    replay.add_argument("--loop", action="store_true")
+    add_server_arguments(replay)
+
+    args = parser.parse_args()
+
+    server = MotiveStandIn(args.local_ip, args.command_port, args.data_port, args.multicast)
+    server.start()
+    try:
+        if not server.wait_for_client(args.wait):
+            raise SystemExit("No client connected.")
+
+        if args.command == "replay":
+            while True:
+                start = time.perf_counter()
+                sent = server.replay(args.capture, args.speed)
+                elapsed = time.perf_counter() - start
+                print(f"sent {sent} frames in {elapsed:.2f}s ({sent / elapsed:,.0f}/s)")
+                if not args.loop:
+                    break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
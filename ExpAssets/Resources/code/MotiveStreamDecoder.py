@@ -0,0 +1,300 @@
+from struct import Struct
+from typing import Union
+
+import numpy as np
+
+# Little-endian primitives shared by every decode call
+_uint32 = Struct("<I")
+# Data block header: count, byte size
+_block = Struct("<II")
+BLOCK_HEADER_SIZE = _block.size
+
+# From NatNet 4.1 every data block carries its byte size, there is an assets
+# block, and the frame suffix has the layout below; older streams have none
+# of these, so their blocks cannot be skipped to reach the suffix
+SIZED_BLOCKS_VERSION = (4, 1)
+
+# NAT_FRAMEOFDATA frame suffix (4.1+): timecode, timecode subframe, timestamp (s),
+# camera mid-exposure / camera data received / transmit stamps (server
+# high-resolution clock ticks), precision timestamp (s, 1/2^32 s), then params
+_suffix = Struct("<IIdQQQIIh")
+SUFFIX_SIZE = _suffix.size
+
+# Markers are packed as three little-endian float32s (x, y, z)
+MARKER_DTYPE = np.dtype("<f4")
+MARKER_SIZE = 3 * MARKER_DTYPE.itemsize
+
+# NatNet 4.x rigid body record: id, position, orientation quaternion (x, y, z, w),
+# mean marker error and tracking flags; 38 bytes, packed
+RIGID_BODY_DTYPE = np.dtype(
+    [("id", "<i4"), ("pos", "<f4", (3,)), ("rot", "<f4", (4,)), ("error", "<f4"), ("params", "<i2")]
+)
+
+# NatNet 4.x labeled marker record: encoded id (model id << 16 | marker id), position,
+# size, status flags and residual; 26 bytes, packed
+LABELED_MARKER_DTYPE = np.dtype(
+    [("id", "<u4"), ("pos", "<f4", (3,)), ("size", "<f4"), ("params", "<i2"), ("residual", "<f4")]
+)
+
+# Decoded rigid bodies, as delivered to listeners
+RIGID_BODIES = np.dtype(
+    [
+        ("id", "i4"),
+        ("pos_x", "f4"),
+        ("pos_y", "f4"),
+        ("pos_z", "f4"),
+        ("rot_x", "f4"),
+        ("rot_y", "f4"),
+        ("rot_z", "f4"),
+        ("rot_w", "f4"),
+        ("error", "f4"),
+        ("tracking_valid", "?"),
+    ]
+)
+
+# Decoded labeled markers, as delivered to listeners
+LABELED_MARKERS = np.dtype(
+    [
+        ("id", "u4"),
+        ("marker_id", "i4"),
+        ("model_id", "i4"),
+        ("pos_x", "f4"),
+        ("pos_y", "f4"),
+        ("pos_z", "f4"),
+        ("size", "f4"),
+        ("residual", "f4"),
+        ("occluded", "?"),
+        ("point_cloud_solved", "?"),
+        ("model_solved", "?"),
+        ("has_model", "?"),
+        ("unlabeled", "?"),
+        ("active", "?"),
+    ]
+)
+
+# Labeled marker status bits in `params`, in bit order
+LABELED_MARKER_FLAGS = (
+    "occluded",
+    "point_cloud_solved",
+    "model_solved",
+    "has_model",
+    "unlabeled",
+    "active",
+)
+
+# NatNet 4.1+ NAT_FRAMEOFDATA data blocks, in stream order; each opens with a count and byte size
+FRAME_BLOCKS = (
+    "marker_sets",
+    "legacy_markers",
+    "rigid_bodies",
+    "skeletons",
+    "assets",
+    "labeled_markers",
+    "force_plates",
+    "devices",
+)
+
+
+class MotiveStreamDecoder(object):
+    """
+    Vectorized alternative to MotiveStreamParser.
+
+    Exposes the same seek/tell/sizeof/parse interface, but reads fixed-width
+    fields with struct.unpack_from and whole marker blocks with a single
+    np.frombuffer over the packet, so no per-marker Python objects are built.
+
+    Marker arrays returned by parse_markers() are views into the packet
+    buffer; copy them if they need to outlive it (or a reused buffer's
+    next packet).
+
+    A reusable receive buffer (bytearray) can be decoded in place by passing
+    the datagram's length as `end`. Only bytes and bytearray are accepted
+    (anything else raises TypeError): labels are found with find() and
+    startswith(), which memoryview lacks, so it would have to be copied whole.
+    """
+
+    def __init__(
+        self,
+        stream: Union[bytes, bytearray],
+        offset: int = 0,
+        end: Union[int, None] = None,
+    ):
+        if not isinstance(stream, (bytes, bytearray)):
+            raise TypeError(
+                f"MotiveStreamDecoder needs bytes or bytearray, not {type(stream).__name__}"
+            )
+
+        self.__stream = stream
+        self.__offset = offset
+        self.__end = len(stream) if end is None else end
+
+        self.__sizes = {
+            "size": _uint32.size,
+            "count": _uint32.size,
+            "frame_number": _uint32.size,
+            "unlabeled_marker": MARKER_SIZE,
+            "legacy_marker": MARKER_SIZE,
+        }
+
+    def seek(self, by: int) -> None:
+        self.__offset += by
+
+    def tell(self) -> int:
+        return self.__offset
+
+    def remaining(self) -> int:
+        """Bytes left in the packet after the current offset."""
+        return self.__end - self.__offset
+
+    def startswith(self, prefix: bytes, offset: int) -> bool:
+        """Whether the packet holds `prefix` at an absolute offset (compared in place)."""
+        return offset + len(prefix) <= self.__end and self.__stream.startswith(prefix, offset)
+
+    def sizeof(self, asset_type: str, asset_count: int = 1) -> int:
+        return self.__sizes[asset_type] * asset_count
+
+    def parse(self, asset_type: str) -> Union[str, int, dict]:
+        if asset_type == "label":
+            end = self.__stream.find(b"\0", self.__offset, self.__end)
+            contents = str(self.__stream[self.__offset : end], "utf-8")
+            self.__offset = end + 1
+            return contents
+
+        if asset_type in ("size", "count", "frame_number"):
+            (contents,) = _uint32.unpack_from(self.__stream, self.__offset)
+            self.seek(_uint32.size)
+            return contents
+
+        if asset_type in ("unlabeled_marker", "legacy_marker"):
+            pos = self.parse_markers(1)[0]
+            return {"pos_x": pos[0], "pos_y": pos[1], "pos_z": pos[2]}
+
+        raise KeyError(f"MotiveStreamDecoder cannot parse asset type '{asset_type}'")
+
+    def skip_block(self) -> int:
+        """Jump over a data block using its size field; returns the block's count."""
+        count, size = _block.unpack_from(self.__stream, self.__offset)
+        self.__offset += BLOCK_HEADER_SIZE + size
+        return count
+
+    def skip_blocks(self, n_blocks: int) -> int:
+        """Jump over up to `n_blocks` data blocks, stopping at a truncated one; returns blocks skipped."""
+        stream, offset, end = self.__stream, self.__offset, self.__end
+        skipped = 0
+        while skipped < n_blocks and end - offset >= BLOCK_HEADER_SIZE:
+            _, size = _block.unpack_from(stream, offset)
+            offset += BLOCK_HEADER_SIZE + size
+            skipped += 1
+
+        self.__offset = offset
+        return skipped
+
+    def parse_markers(self, count: int) -> np.ndarray:
+        """Return the next `count` markers as a (count, 3) float32 view."""
+        markers = np.frombuffer(
+            self.__stream, dtype=MARKER_DTYPE, count=count * 3, offset=self.__offset
+        ).reshape(count, 3)
+        self.seek(count * MARKER_SIZE)
+        return markers
+
+    def markers_at(self, offset: int, count: int) -> np.ndarray:
+        """Return `count` markers at an absolute offset as a (count, 3) float32 view; does not seek."""
+        return np.frombuffer(
+            self.__stream, dtype=MARKER_DTYPE, count=count * 3, offset=offset
+        ).reshape(count, 3)
+
+    def parse_suffix(self) -> Union[dict, None]:
+        """
+        Decode the NatNet 4.1+ frame suffix that follows the last data block.
+
+        Call once every block has been read or skipped. Bytes after the suffix
+        (e.g. an end-of-data tag) are ignored.
+
+        Returns:
+            dict: The suffix fields, or None if the packet ends before a full suffix
+        """
+        if self.remaining() < SUFFIX_SIZE:
+            return None
+
+        (
+            timecode,
+            timecode_sub,
+            timestamp,
+            camera_mid_exposure,
+            camera_data_received,
+            transmit,
+            precision_seconds,
+            precision_fraction,
+            params,
+        ) = _suffix.unpack_from(self.__stream, self.__offset)
+        self.seek(SUFFIX_SIZE)
+
+        return {
+            "timecode": timecode,
+            "timecode_sub": timecode_sub,
+            "timestamp": timestamp,
+            "camera_mid_exposure": camera_mid_exposure,
+            "camera_data_received": camera_data_received,
+            "transmit": transmit,
+            "precision_timestamp": precision_seconds + precision_fraction / 2**32,
+            "is_recording": bool(params & 0x01),
+            "tracked_models_changed": bool(params & 0x02),
+        }
+
+    def parse_records(self, dtype: np.dtype, count: int) -> np.ndarray:
+        """Return the next `count` fixed-size records as a structured view."""
+        records = np.frombuffer(self.__stream, dtype=dtype, count=count, offset=self.__offset)
+        self.seek(count * dtype.itemsize)
+        return records
+
+    def parse_rigid_bodies(self) -> Union[np.ndarray, None]:
+        """
+        Decode a rigid body block into a RIGID_BODIES array (a copy, not a view).
+
+        Returns None, having skipped the block, if its size does not match the
+        NatNet 4.x record layout (e.g. older streams with per-body markers).
+        """
+        count = self.parse("count")
+        size = self.parse("size")
+        if size != count * RIGID_BODY_DTYPE.itemsize:
+            self.seek(size)
+            return None
+
+        records = self.parse_records(RIGID_BODY_DTYPE, count)
+        rigid_bodies = np.empty(count, dtype=RIGID_BODIES)
+        rigid_bodies["id"] = records["id"]
+        for axis, name in enumerate("xyz"):
+            rigid_bodies[f"pos_{name}"] = records["pos"][:, axis]
+        for axis, name in enumerate("xyzw"):
+            rigid_bodies[f"rot_{name}"] = records["rot"][:, axis]
+        rigid_bodies["error"] = records["error"]
+        rigid_bodies["tracking_valid"] = (records["params"] & 0x01) != 0
+
+        return rigid_bodies
+
+    def parse_labeled_markers(self) -> Union[np.ndarray, None]:
+        """
+        Decode a labeled marker block into a LABELED_MARKERS array (a copy, not a view).
+
+        Returns None, having skipped the block, if its size does not match the
+        NatNet 4.x record layout.
+        """
+        count = self.parse("count")
+        size = self.parse("size")
+        if size != count * LABELED_MARKER_DTYPE.itemsize:
+            self.seek(size)
+            return None
+
+        records = self.parse_records(LABELED_MARKER_DTYPE, count)
+        markers = np.empty(count, dtype=LABELED_MARKERS)
+        markers["id"] = records["id"]
+        markers["marker_id"] = records["id"] & 0xFFFF
+        markers["model_id"] = records["id"] >> 16
+        for axis, name in enumerate("xyz"):
+            markers[f"pos_{name}"] = records["pos"][:, axis]
+        markers["size"] = records["size"]
+        markers["residual"] = records["residual"]
+        for bit, flag in enumerate(LABELED_MARKER_FLAGS):
+            markers[flag] = (records["params"] & (1 << bit)) != 0
+
+        return markers
@@ -0,0 +1,194 @@
+"""
+Online movement onset/offset detection from the marker stream.
+
+Feed each of a marker set's frames to MovementDetector.update(), e.g. from
+NatNetClient's markers_listener:
+
+    detector = MovementDetector(sample_rate=120, on_onset=print)
+
+    def markers_listener(marker_set):
+        if marker_set["label"] == "hand":
+            detector.update(marker_set)
+"""
+
+import time
+from collections import deque
+from typing import Callable, Union
+
+import numpy as np
+
+from OptiTracker import StreamingButterworth
+
+
+class MovementDetector(object):
+    """
+    Incremental velocity-threshold detector for movement onset and offset.
+
+    Speed is computed like OptiTracker.velocity(): the distance between the
+    first and last (low-passed) marker centroids of a trailing window of
+    frames, over the time the window spans. Each update does a fixed amount
+    of work, so it is safe to run on the receive path.
+
+    Onset fires once speed has stayed above onset_threshold for
+    min_duration; offset fires once it has stayed below offset_threshold
+    (lower, for hysteresis) for min_duration. Events report the frame where
+    the crossing began, and latency from the frame's receive time to
+    detection.
+
+    Attributes:
+        sample_rate (float): Sampling rate in Hz
+        onset_threshold (float): Speed, in mm/s, above which movement starts
+        offset_threshold (float): Speed, in mm/s, below which movement ends
+        min_duration (float): Seconds a crossing must persist to count
+        window_size (int): Frames spanned by each speed estimate
+        on_onset (Callable): Called with the event dict on onset
+        on_offset (Callable): Called with the event dict on offset
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 120,
+        onset_threshold: float = 100.0,
+        offset_threshold: float = 50.0,
+        min_duration: float = 0.05,
+        window_size: int = 5,
+        cutoff: float = 10,
+        on_onset: Union[Callable, None] = None,
+        on_offset: Union[Callable, None] = None,
+        latency_samples: int = 1024,
+    ):
+        """
+        Initialize the detector.
+
+        Args:
+            sample_rate (float, optional): Sampling rate in Hz. Defaults to 120.
+            onset_threshold (float, optional): Onset speed in mm/s. Defaults to 100.
+            offset_threshold (float, optional): Offset speed in mm/s. Defaults to 50.
+            min_duration (float, optional): Seconds a crossing must last. Defaults to 0.05.
+            window_size (int, optional): Frames per speed estimate. Defaults to 5.
+            cutoff (float, optional): Low-pass cutoff in Hz; 0 disables smoothing. Defaults to 10.
+            on_onset (Callable, optional): Onset callback. Defaults to None.
+            on_offset (Callable, optional): Offset callback. Defaults to None.
+            latency_samples (int, optional): Detection latencies kept. Defaults to 1024.
+        """
+        if offset_threshold > onset_threshold:
+            raise ValueError("Offset threshold must not exceed the onset threshold.")
+
+        if window_size < 2:
+            raise ValueError("Window size must cover at least two frames.")
+
+        self.sample_rate = sample_rate
+        self.onset_threshold = onset_threshold
+        self.offset_threshold = offset_threshold
+        self.min_duration = min_duration
+        self.window_size = window_size
+        self.on_onset = on_onset
+        self.on_offset = on_offset
+
+        self.__filter = StreamingButterworth(2, cutoff, sample_rate) if cutoff else None
+        self.__latencies = deque(maxlen=latency_samples)
+        self.reset()
+
+    @property
+    def moving(self) -> bool:
+        """Whether movement is currently under way."""
+        return self.__moving
+
+    @property
+    def speed(self) -> float:
+        """Get the most recent speed estimate, in mm/s (NaN until the window fills)."""
+        return self.__speed
+
+    def reset(self) -> None:
+        """Forget the stream so far, e.g. between trials; latency history is kept."""
+        self.__window = deque(maxlen=self.window_size)
+        self.__moving = False
+        self.__speed = float("nan")
+        self.__crossing = None
+        if self.__filter is not None:
+            self.__filter.reset()
+
+    def update(self, marker_set: dict) -> Union[dict, None]:
+        """
+        Process one frame of a marker set.
+
+        Args:
+            marker_set (dict): As passed to NatNetClient's markers_listener; uses
+                frame_number, markers ((n, 3) metres) and received (perf_counter seconds).
+
+        Returns:
+            dict: The onset/offset event detected on this frame, if any
+        """
+        markers = marker_set["markers"]
+        if not len(markers):
+            return None
+
+        # metres to mm, as OptiTracker queries return
+        centroid = np.mean(markers, axis=0, dtype=np.float64) * 1000
+        if np.isnan(centroid).any():
+            return None
+        if self.__filter is not None:
+            centroid = self.__filter.filter(centroid)
+
+        frame_number = marker_set["frame_number"]
+        self.__window.append((frame_number, centroid))
+        if len(self.__window) < self.window_size:
+            return None
+
+        first_frame, first = self.__window[0]
+        elapsed = (frame_number - first_frame) / self.sample_rate
+        if elapsed <= 0:
+            return None
+
+        self.__speed = float(np.sqrt(np.sum((centroid - first) ** 2))) / elapsed
+
+        if self.__moving:
+            crossed = self.__speed < self.offset_threshold
+        else:
+            crossed = self.__speed > self.onset_threshold
+
+        if not crossed:
+            self.__crossing = None
+            return None
+
+        if self.__crossing is None:
+            self.__crossing = frame_number
+
+        if (frame_number - self.__crossing) / self.sample_rate < self.min_duration:
+            return None
+
+        self.__moving = not self.__moving
+        event = {
+            "event": "onset" if self.__moving else "offset",
+            "frame_number": self.__crossing,
+            "detected_frame": frame_number,
+            "speed": self.__speed,
+            "received": marker_set.get("received"),
+            "detected": time.perf_counter(),
+        }
+        self.__crossing = None
+
+        if event["received"] is not None:
+            event["latency"] = event["detected"] - event["received"]
+            self.__latencies.append(event["latency"])
+
+        callback = self.on_onset if self.__moving else self.on_offset
+        if callback is not None:
+            callback(event)
+
+        return event
+
+    def latency_stats(self) -> dict:
+        """Summarize receive-to-detection latencies, in ms."""
+        if not self.__latencies:
+            return {}
+
+        latencies = np.array(self.__latencies) * 1000
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]).tolist()
+        return {
+            "events": len(latencies),
+            "p50": p50,
+            "p90": p90,
+            "p99": p99,
+            "max": float(latencies.max()),
+        }
@@ -1,10 +1,13 @@
 import os
 import numpy as np
 import sqlite3
-from scipy.signal import butter, sosfiltfilt
-import klibs
+from scipy.signal import butter, sosfilt, sosfilt_zi, sosfiltfilt
+from functools import lru_cache
 import warnings
-from pprint import pprint
+from typing import Union
+
+from FrameRingBuffer import FrameRingBuffer
+from TrialFile import TRIAL_EXT, open_trial, record_positions
 # from klibs.KLDatabase import KLDatabase as kld
 
 # TODO:
@@ -13,6 +16,166 @@ from pprint import pprint
 # refactor nomeclature about frame indexing/querying
 
 
+def frame_centroids(frames: np.ndarray) -> np.ndarray:
+    """
+    Average marker positions within each frame in a single grouped reduction.
+
+    Rows are grouped by frame_number (sorted first if needed) and summed with
+    np.add.reduceat, so cost is O(rows) rather than O(frames x rows). Markers
+    missing from a frame, whether absent or NaN, are left out of its mean; a
+    frame with no valid markers gets NaN.
+
+    Args:
+        frames (np.ndarray): Rows with frame_number, pos_x, pos_y and pos_z fields.
+
+    Returns:
+        np.ndarray: One row per distinct frame_number, in ascending order
+    """
+    frame_numbers = frames["frame_number"]
+    order = None
+    if len(frame_numbers) > 1 and np.any(frame_numbers[1:] < frame_numbers[:-1]):
+        order = np.argsort(frame_numbers, kind="stable")
+        frame_numbers = frame_numbers[order]
+
+    starts = np.flatnonzero(np.diff(frame_numbers, prepend=frame_numbers[:1] - 1))
+
+    means = np.zeros(
+        len(starts),
+        dtype=[
+            ("frame_number", "i8"),
+            ("pos_x", "f8"),
+            ("pos_y", "f8"),
+            ("pos_z", "f8"),
+        ],
+    )
+    if not len(starts):
+        return means
+
+    means["frame_number"] = frame_numbers[starts]
+
+    for col in ["pos_x", "pos_y", "pos_z"]:
+        values = np.asarray(frames[col], dtype="f8")
+        if order is not None:
+            values = values[order]
+
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means[col] = sums / counts
+
+    return means
+
+
+def position_rows(frame_numbers: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """
+    Lay out marker positions as trial-file query rows.
+
+    Args:
+        frame_numbers (np.ndarray): Frame number of each marker.
+        positions (np.ndarray): (n, 3) marker positions in metres.
+
+    Returns:
+        np.ndarray: Rows of frame_number and pos_x/y/z in (rounded) millimetres
+    """
+    data = np.zeros(
+        len(frame_numbers),
+        dtype=[
+            ("frame_number", "i8"),
+            ("pos_x", "float"),
+            ("pos_y", "float"),
+            ("pos_z", "float"),
+        ],
+    )
+    data["frame_number"] = frame_numbers
+
+    # match file queries: metres to integer millimetres
+    for axis, col in enumerate(["pos_x", "pos_y", "pos_z"]):
+        data[col] = np.rint(positions[:, axis] * 1000)
+
+    return data
+
+
+@lru_cache(maxsize=None)
+def butter_sos(order: int, cutoff: float, filtype: str, sample_rate: float) -> np.ndarray:
+    """Design (once per parameter set) a Butterworth filter as second-order sections."""
+    # shared between callers via the cache; treat as read-only
+    return butter(N=order, Wn=cutoff, btype=filtype, output="sos", fs=sample_rate)
+
+
+class StreamingButterworth(object):
+    """
+    Causal Butterworth filter over (x, y, z) positions that carries its state.
+
+    Successive calls to filter() continue where the last one left off, so
+    feeding a stream one frame at a time costs O(1) per frame and yields the
+    same output as filtering the whole stream at once. State is initialised
+    to the steady state for the first sample, avoiding a start-up transient.
+
+    Only useful on a continuous stream (MovementDetector feeds it every
+    frame); OptiTracker's window queries overlap, so they are smoothed with
+    the zero-phase sosfiltfilt instead.
+
+    Attributes:
+        order (int): Filter order
+        cutoff (float): Cutoff frequency in Hz
+        sample_rate (float): Sampling rate in Hz
+        filtype (str): Filter type, e.g. "low"
+    """
+
+    def __init__(
+        self,
+        order: int = 2,
+        cutoff: float = 10,
+        sample_rate: float = 120,
+        filtype: str = "low",
+    ):
+        self.order = order
+        self.cutoff = cutoff
+        self.sample_rate = sample_rate
+        self.filtype = filtype
+
+        self.__sos = butter_sos(order, cutoff, filtype, sample_rate)
+        self.__zi = None
+
+    def reset(self) -> None:
+        """Forget the filter state; the next sample re-initialises it."""
+        self.__zi = None
+
+    def filter(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Filter the next samples of the stream.
+
+        Args:
+            positions (np.ndarray): (n, 3) positions, or a single (3,) position.
+
+        Returns:
+            np.ndarray: Filtered positions, same shape as the input
+        """
+        positions = np.asarray(positions, dtype="f8")
+        samples = positions.reshape(-1, 3)
+        if not len(samples):
+            return positions.copy()
+
+        if self.__zi is None:
+            # (sections, 2, 3): one state per section, delay and axis
+            self.__zi = sosfilt_zi(self.__sos)[:, :, None] * samples[0]
+
+        if len(samples) == 1:
+            # per-frame path: direct form II transposed, skipping sosfilt's call overhead
+            x = samples[0]
+            for (b0, b1, b2, _, a1, a2), zi in zip(self.__sos, self.__zi):
+                y = b0 * x + zi[0]
+                zi[0] = b1 * x - a1 * y + zi[1]
+                zi[1] = b2 * x - a2 * y
+                x = y
+            return x.reshape(positions.shape)
+
+        filtered, self.__zi = sosfilt(self.__sos, samples, axis=0, zi=self.__zi)
+        return filtered.reshape(positions.shape)
+
+
 class OptiTracker(object):
     """
     A class for querying and operating on motion tracking data.
@@ -21,16 +184,25 @@ class OptiTracker(object):
     to calculate velocities and positions in 3D space. It handles data loading,
     frame querying, and various spatial calculations.
 
+    Frames are read either from a trial file (data_dir: CSV, or a memory-mapped
+    binary trial file as described in TrialFile) or, in streaming mode,
+    from a FrameRingBuffer that is filled as frames arrive (see feed()), in
+    which case queries only touch the requested window and never hit disk.
+
     Attributes:
         marker_count (int): Number of markers to track
         sample_rate (int): Sampling rate of the tracking system in Hz
         window_size (int): Number of frames to consider for calculations
         data_dir (str): Directory path containing the tracking data files
+        frame_buffer (FrameRingBuffer): Live frame source; enables streaming mode
 
     Methods:
         velocity(num_frames): Calculate velocity based on marker positions across specified number of frames
         position(): Get current position of markers
         distance(num_frames: int): Calculate distance traveled over specified number of frames
+        window(start_frame, end_frame): Get rows for an arbitrary range of frames
+        window_time(start, end): Get rows for a range of seconds into the recording
+        feed(marker_set: dict): Append a decoded marker set to the frame buffer
     """
 
     def __init__(
@@ -40,6 +212,7 @@ class OptiTracker(object):
         window_size: int = 5,
         data_dir: str = "",
         db_name: str = "optitracker.db",
+        frame_buffer: Union[FrameRingBuffer, None] = None,
     ):
         """
         Initialize the OptiTracker object.
@@ -49,6 +222,7 @@ class OptiTracker(object):
             sample_rate (int, optional): Sampling rate in Hz. Defaults to 120.
             window_size (int, optional): Number of frames for calculations. Defaults to 5.
             data_dir (str, optional): Path to data directory. Defaults to empty string.
+            frame_buffer (FrameRingBuffer, optional): Live frame source; when set, queries read from it instead of data_dir.
         """
 
         if marker_count:
@@ -57,6 +231,11 @@ class OptiTracker(object):
         self.__sample_rate = sample_rate
         self.__data_dir = data_dir
         self.__window_size = window_size
+        self.__frame_buffer = frame_buffer
+        # ((path, inode), (header, dtype map, header size)) of the last file read
+        self.__layout_cache = None
+        # ((path, size), memmap) of the last binary recording read
+        self.__recording_cache = None
         # self.db = self.__connect(db_name)
 
         # self.cursor = self.db.cursor()
@@ -103,6 +282,16 @@ class OptiTracker(object):
         """Set the data directory path."""
         self.__data_dir = data_dir
 
+    @property
+    def frame_buffer(self) -> Union[FrameRingBuffer, None]:
+        """Get the live frame buffer (None when reading from file)."""
+        return self.__frame_buffer
+
+    @frame_buffer.setter
+    def frame_buffer(self, frame_buffer: Union[FrameRingBuffer, None]) -> None:
+        """Set the live frame buffer; None reverts to reading from data_dir."""
+        self.__frame_buffer = frame_buffer
+
     @property
     def sample_rate(self) -> int:
         """Get the sampling rate."""
@@ -148,6 +337,87 @@ class OptiTracker(object):
         frames = self.__query_frames(num_frames)
         return self.__euclidean_distance(frames)
 
+    def window(self, start_frame: int, end_frame: int) -> np.ndarray:
+        """
+        Get the rows for an arbitrary range of frames from the data file.
+
+        Frames are located by binary search over the (sorted) frame numbers:
+        a memory-mapped frame_number column for binary recordings, or byte
+        offsets into the file for CSV, so only the range itself is parsed.
+
+        Args:
+            start_frame (int): First frame number to include.
+            end_frame (int): Last frame number to include.
+
+        Returns:
+            np.ndarray: Rows of frame_number and pos_x/y/z (mm), as from queries
+        """
+        if end_frame < start_frame:
+            raise ValueError("End frame must not precede start frame.")
+
+        self.__check_data_file()
+
+        if self.__data_dir.endswith(TRIAL_EXT):
+            return self.__recording_rows(start_frame, end_frame)
+
+        header, dtype_map, header_size = self.__file_layout()
+        fn_idx = header.index("frame_number")
+
+        with open(self.__data_dir, "rb") as file:
+            size = file.seek(0, os.SEEK_END)
+            start = self.__seek_frame(file, start_frame, fn_idx, header_size, size)
+            stop = self.__seek_frame(file, end_frame + 1, fn_idx, header_size, size)
+            file.seek(start)
+            chunk = file.read(stop - start)
+
+        lines = [row.decode("utf-8") for row in chunk.splitlines() if row.strip()]
+        if not lines:
+            return np.zeros(0, dtype=[(name, t) for name, t in dtype_map])
+
+        data = np.atleast_1d(np.genfromtxt(lines, delimiter=",", dtype=dtype_map))
+        for col in ['pos_x', 'pos_y', 'pos_z']:
+            data[col] = np.rint(data[col] * 1000).astype(np.int32)
+
+        return data
+
+    def window_time(self, start: float, end: float) -> np.ndarray:
+        """
+        Get the rows for a time range, in seconds from the recording's first frame.
+
+        Args:
+            start (float): Start time in seconds (inclusive).
+            end (float): End time in seconds (inclusive).
+
+        Returns:
+            np.ndarray: Rows of frame_number and pos_x/y/z (mm), as from queries
+        """
+        first_frame = self.__first_frame()
+        return self.window(
+            first_frame + int(np.ceil(start * self.__sample_rate)),
+            first_frame + int(np.floor(end * self.__sample_rate)),
+        )
+
+    def feed(self, marker_set: dict) -> None:
+        """
+        Append a decoded marker set to the frame buffer.
+
+        Suitable for use as (or from within) a NatNetClient markers listener.
+        Alternatively, register frame_buffer in NatNetClient.frame_buffers to
+        have the data thread write to it directly.
+
+        Frames are stamped with the packet's receive time, not the time this
+        is called, so dispatch queueing delays do not skew them.
+
+        Args:
+            marker_set (dict): Marker set as passed to NatNetClient.markers_listener.
+        """
+        if self.__frame_buffer is None:
+            raise ValueError("No frame buffer was set to feed.")
+
+        self.__frame_buffer.write(
+            marker_set["frame_number"], marker_set["received"], marker_set["markers"]
+        )
+
     def __velocity(self, frames: np.ndarray = np.array([])) -> float:
         """
         Calculate velocity using position data over the specified window.
@@ -202,10 +472,14 @@ class OptiTracker(object):
     # TODO: but first make sure this isn't a bad idea.
 
     def __smooth(
-        self, order=2, cutoff=10, filtype="low", frames: np.ndarray = np.array([])
+        self,
+        order=2,
+        cutoff=10,
+        filtype="low",
+        frames: np.ndarray = np.array([]),
     ) -> np.ndarray:
         """
-        Apply a dual-pass Butterworth filter to positional data.
+        Apply a Butterworth filter to positional data.
 
         Args:
             order (int, optional): Order of the Butterworth filter. Defaults to 2.
@@ -224,23 +498,21 @@ class OptiTracker(object):
             len(frames),
             dtype=[
                 ("frame_number", "i8"),
-                ("pos_x", "i8"),
-                ("pos_y", "i8"),
-                ("pos_z", "i8"),
+                ("pos_x", "f8"),
+                ("pos_y", "f8"),
+                ("pos_z", "f8"),
             ],
         )
+        smooth["frame_number"] = frames["frame_number"]
 
-        butt = butter(
-            N=order, Wn=cutoff, btype=filtype, output="sos", fs=self.__sample_rate
-        )
+        positions = np.column_stack([frames["pos_x"], frames["pos_y"], frames["pos_z"]])
 
-        # print("[__smooth()]")
-        # print("frames:")
-        # pprint(frames)
+        sos = butter_sos(order, cutoff, filtype, self.__sample_rate)
+        filtered = sosfiltfilt(sos=sos, x=positions, axis=0)
 
-        smooth["pos_x"] = sosfiltfilt(sos=butt, x=frames["pos_x"])
-        smooth["pos_y"] = sosfiltfilt(sos=butt, x=frames["pos_y"])
-        smooth["pos_z"] = sosfiltfilt(sos=butt, x=frames["pos_z"])
+        smooth["pos_x"] = filtered[:, 0]
+        smooth["pos_y"] = filtered[:, 1]
+        smooth["pos_z"] = filtered[:, 2]
 
         return smooth
 
@@ -252,7 +524,7 @@ class OptiTracker(object):
             frames (np.ndarray, optional): Array of frame data; queries last window_size frames if empty.
 
         Returns:
-            np.ndarray: Array of mean positions
+            np.ndarray: Array of mean positions, one row per frame present
 
         Note:
             Currently applies smoothing function to generate means.
@@ -261,48 +533,7 @@ class OptiTracker(object):
         if len(frames) == 0:
             frames = self.__query_frames()
 
-        print("OptiTracker column_means, got frames:")
-        pprint(frames)
-
-        # Create output array with the correct dtype
-        means = np.zeros(
-            len(frames) // self.__marker_count,
-            dtype=[
-                ("frame_number", "i8"),
-                ("pos_x", "i8"),
-                ("pos_y", "i8"),
-                ("pos_z", "i8"),
-            ],
-        )
-
-        # Group by marker (every nth row where n is marker_count)
-        start = min(frames["frame_number"])
-        stop = max(frames["frame_number"]) + 1
-
-        for frame_number in range(start, stop):
-            this_frame = frames[frames["frame_number"] == frame_number,]
-
-            print("OptiTracker column_means, this frame:")
-            pprint(this_frame)
-
-            # if not len(frame):
-            #     tmp = frame_number - 1
-            #     while not len(frame) and tmp >= start:
-            #         frame = frames[frames["frame_number"] == tmp,]
-            #         tmp -= 1
-
-
-            idx = frame_number - start
-            means[idx]["pos_x"] = np.mean(this_frame["pos_x"])
-            means[idx]["pos_y"] = np.mean(this_frame["pos_y"])
-            means[idx]["pos_z"] = np.mean(this_frame["pos_z"])
-
-            idx += 1
-
-            # except RuntimeWarning as e:
-            #     means[idx]["pos_x"] = 0.0
-            #     means[idx]["pos_y"] = 0.0
-            #     means[idx]["pos_z"] = 0.0
+        means = frame_centroids(frames)
 
         # if smooth:
         #     means = self.__smooth(frames=means)
@@ -324,17 +555,130 @@ class OptiTracker(object):
             FileNotFoundError: If data directory does not exist
         """
 
+        if self.__frame_buffer is not None:
+            return self.__query_buffer(num_frames)
+
+        self.__check_data_file()
+
+        if num_frames < 0:
+            raise ValueError("Number of frames cannot be negative.")
+
+        if num_frames == 0:
+            num_frames = self.__window_size
+
+        if self.__data_dir.endswith(TRIAL_EXT):
+            recording = self.__recording()
+            if not len(recording):
+                raise ValueError(f"Data file contains no frames:\n{self.__data_dir}")
+            last_frame = int(recording["frame_number"][-1])
+            return self.__recording_rows(last_frame - num_frames + 1, last_frame)
+
+        header, dtype_map, header_size = self.__file_layout()
+        lines = self.__tail_lines(num_frames, header, header_size)
+
+        # parse only the rows covering the requested frames
+        data = np.atleast_1d(
+            np.genfromtxt(lines, delimiter=",", dtype=dtype_map)
+        )
+
+        for col in ['pos_x', 'pos_y', 'pos_z']:
+            data[col] = np.rint(data[col] * 1000).astype(np.int32)
+
+        return data
+
+    def __check_data_file(self) -> None:
         if self.__data_dir == "":
             raise ValueError("No data directory was set.")
 
         if not os.path.exists(self.__data_dir):
             raise FileNotFoundError(f"Data directory not found at:\n{self.__data_dir}")
 
-        if num_frames < 0:
-            raise ValueError("Number of frames cannot be negative.")
+    def __recording(self) -> np.ndarray:
+        """Memory-map a binary trial file, remapping only when it has grown."""
+        key = (self.__data_dir, os.path.getsize(self.__data_dir))
+        if self.__recording_cache is None or self.__recording_cache[0] != key:
+            _, records = open_trial(self.__data_dir)
+            self.__recording_cache = (key, records)
 
-        with open(self.__data_dir, "r") as file:
-            header = file.readline().strip().split(",")
+        return self.__recording_cache[1]
+
+    def __recording_rows(self, start_frame: int, end_frame: int) -> np.ndarray:
+        recording = self.__recording()
+        frame_numbers = recording["frame_number"]
+
+        start = np.searchsorted(frame_numbers, start_frame, side="left")
+        stop = np.searchsorted(frame_numbers, end_frame, side="right")
+        records = recording[start:stop]
+
+        return position_rows(records["frame_number"], record_positions(records))
+
+    def __first_frame(self) -> int:
+        self.__check_data_file()
+
+        if self.__data_dir.endswith(TRIAL_EXT):
+            recording = self.__recording()
+            if not len(recording):
+                raise ValueError(f"Data file contains no frames:\n{self.__data_dir}")
+            return int(recording["frame_number"][0])
+
+        header, _, header_size = self.__file_layout()
+        with open(self.__data_dir, "rb") as file:
+            file.seek(header_size)
+            row = file.readline()
+
+        if not row.endswith(b"\n") or not row.strip():
+            raise ValueError(f"Data file contains no frames:\n{self.__data_dir}")
+        return int(row.split(b",")[header.index("frame_number")])
+
+    @staticmethod
+    def __seek_frame(file, frame_number: int, fn_idx: int, header_size: int, size: int) -> int:
+        """
+        Binary search a CSV data file for the first row at or after frame_number.
+
+        Returns:
+            int: Byte offset of that row (file size if there is none)
+        """
+
+        def row_at(pos):
+            # the first complete row starting at or after pos
+            file.seek(pos - 1)
+            if pos > header_size:
+                file.readline()
+            else:
+                file.seek(header_size)
+            start = file.tell()
+            line = file.readline()
+            return start, file.tell(), line
+
+        lo, hi = header_size, size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            _, end, line = row_at(mid)
+            fields = line.split(b",")
+            if line.endswith(b"\n") and len(fields) > fn_idx and int(fields[fn_idx]) < frame_number:
+                lo = end
+            else:
+                hi = mid
+
+        return row_at(lo)[0] if lo < size else size
+
+    def __file_layout(self) -> tuple:
+        """
+        Read, validate and type the data file's header, cached between queries.
+
+        Returns:
+            tuple: (column names, genfromtxt dtype map, header length in bytes)
+
+        Raises:
+            ValueError: If the expected columns are missing
+        """
+        key = (self.__data_dir, os.stat(self.__data_dir).st_ino)
+        if self.__layout_cache is not None and self.__layout_cache[0] == key:
+            return self.__layout_cache[1]
+
+        with open(self.__data_dir, "rb") as file:
+            header_line = file.readline()
+        header = header_line.decode("utf-8").strip().split(",")
 
         if any(
             col not in header for col in ["frame_number", "pos_x", "pos_y", "pos_z"]
@@ -356,26 +700,100 @@ class OptiTracker(object):
             for name in header
         ]
 
-        # read in data now that columns have been validated and typed
-        data = np.genfromtxt(
-            self.__data_dir, delimiter=",", dtype=dtype_map, skip_header=1
-        )
+        layout = (header, dtype_map, len(header_line))
+        self.__layout_cache = (key, layout)
+        return layout
 
-        for col in ['pos_x', 'pos_y', 'pos_z']:
-            data[col] = np.rint(data[col] * 1000).astype(np.int32)
+    def __tail_lines(self, num_frames: int, header: list, header_size: int) -> list:
+        """
+        Read rows for the last num_frames frame numbers by seeking back from EOF.
+
+        Blocks are read backwards (doubling in size) until they reach a row at or
+        before the lookback frame, so the cost tracks the window, not the file.
+
+        Args:
+            num_frames (int): Number of frames to read.
+            header (list): Column names, from __file_layout().
+            header_size (int): Header length in bytes.
+
+        Returns:
+            list: Decoded data rows, oldest first
+        """
+        fn_idx = header.index("frame_number")
+        block = 8192
+
+        with open(self.__data_dir, "rb") as file:
+            pos = file.seek(0, os.SEEK_END)
+            buf = b""
+
+            while True:
+                read_size = min(block, pos - header_size)
+                pos -= read_size
+                file.seek(pos)
+                buf = file.read(read_size) + buf
+
+                # only newline-terminated rows are complete; the last piece is
+                # empty or a row still being written
+                rows = buf.split(b"\n")[:-1]
+                # the first piece is only a whole row once the header is reached
+                if pos > header_size:
+                    rows = rows[1:]
+                rows = [row.strip() for row in rows]
+                rows = [row for row in rows if row]
+
+                if rows:
+                    lookback = int(rows[-1].split(b",")[fn_idx]) - num_frames
+                    if int(rows[0].split(b",")[fn_idx]) <= lookback:
+                        break
+
+                if pos <= header_size:
+                    break
+
+                block *= 2
+
+        if not rows:
+            raise ValueError(f"Data file contains no frames:\n{self.__data_dir}")
+
+        # Filter for relevant frames
+        start = len(rows)
+        while start > 0 and int(rows[start - 1].split(b",")[fn_idx]) > lookback:
+            start -= 1
+
+        return [row.decode("utf-8") for row in rows[start:]]
+
+    def __query_buffer(self, num_frames: int = 0) -> np.ndarray:
+        """
+        Query frame data from the live frame buffer.
+
+        Args:
+            num_frames (int, optional): Number of frames to query. Defaults to window_size when empty.
+                At most the buffer's capacity - 1 frames are returned.
+
+        Returns:
+            np.ndarray: Array of queried frame data, laid out as __query_frames' file rows
+
+        Raises:
+            ValueError: If num_frames is negative or the buffer holds no frames
+        """
+        if num_frames < 0:
+            raise ValueError("Number of frames cannot be negative.")
 
         if num_frames == 0:
             num_frames = self.__window_size
 
-        # Calculate which frames to include
-        last_frame = data["frame_number"][-1]
-        lookback = last_frame - num_frames
+        # a consistent copy: latest() views can change under the NatNet data thread mid-read,
+        # while snapshot() retries until the writer has not touched the frames it copied
+        frames = self.__frame_buffer.snapshot(num_frames)
+        if not len(frames["count"]):
+            raise ValueError("Frame buffer does not contain any frames yet.")
 
-        # Filter for relevant frames
-        data = data[data["frame_number"] > lookback]
+        # drop the NaN padding past each frame's marker count
+        positions = frames["positions"]
+        present = ~np.isnan(positions[:, :, 0])
+        frame_numbers = np.broadcast_to(frames["frame_number"][:, None], present.shape)
+
+        return position_rows(frame_numbers[present], positions[present])
 
-        return data
-    
     def __connect(self, db_name: str = "optitracker.db") -> sqlite3.Connection:
         """
         Connect to the SQLite database.
@@ -0,0 +1,160 @@
+import json
+from bisect import bisect_right
+from math import sqrt
+
+import numpy as np
+
+# Inter-arrival histogram bin edges, in ms; the last bin is open-ended
+INTERVAL_BINS_MS = (0.0, 0.5, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0, 15.0, 20.0, 50.0, 100.0)
+
+# Stages between camera exposure and a listener, see record_latency():
+#   camera:              mid-exposure -> camera data received by Motive
+#   motive:              camera data received -> frame transmitted
+#   network:             transmit -> receive, beyond the fastest frame seen
+#   camera_to_receive:   the three above
+#   receive_to_listener: receive -> listener called
+LATENCY_STAGES = ("camera", "motive", "network", "camera_to_receive", "receive_to_listener")
+
+
+class StreamStats(object):
+    """
+    Running continuity and timing statistics for a NatNet frame stream.
+
+    record() is called once per decoded frame on the receive thread and does
+    O(1) work; percentiles and summaries are only computed in snapshot().
+    record_latency() adds a sample to one of the LATENCY_STAGES.
+
+    Attributes:
+        decode_samples (int): Most recent decode times (and latencies, per stage)
+            kept for percentiles
+    """
+
+    def __init__(self, decode_samples: int = 4096):
+        self.decode_samples = decode_samples
+        self.reset()
+
+    def reset(self) -> None:
+        self.__frames = 0
+        self.__dropped = 0
+        self.__gaps = 0
+        self.__out_of_order = 0
+        self.__first_frame = None
+        self.__last_frame = None
+        self.__last_received = None
+
+        # Welford's running mean / variance of inter-arrival intervals
+        self.__intervals = 0
+        self.__interval_mean = 0.0
+        self.__interval_m2 = 0.0
+        self.__interval_min = float("inf")
+        self.__interval_max = 0.0
+        self.__histogram = [0] * len(INTERVAL_BINS_MS)
+
+        self.__decode_times = np.zeros(self.decode_samples)
+        self.__decodes = 0
+
+        self.__latencies = {stage: np.zeros(self.decode_samples) for stage in LATENCY_STAGES}
+        self.__latency_counts = dict.fromkeys(LATENCY_STAGES, 0)
+
+    def record(self, frame_number: int, received: float, decode_time: float) -> None:
+        """
+        Add a frame.
+
+        Args:
+            frame_number (int): Motive frame number.
+            received (float): Packet receive time, from time.perf_counter().
+            decode_time (float): Seconds spent decoding the frame.
+        """
+        last = self.__last_frame
+        if last is None:
+            self.__first_frame = frame_number
+        elif frame_number > last + 1:
+            self.__dropped += frame_number - last - 1
+            self.__gaps += 1
+        elif frame_number <= last:
+            self.__out_of_order += 1
+
+        if last is None or frame_number > last:
+            self.__last_frame = frame_number
+        self.__frames += 1
+
+        if self.__last_received is not None:
+            interval = (received - self.__last_received) * 1000
+            self.__intervals += 1
+            delta = interval - self.__interval_mean
+            self.__interval_mean += delta / self.__intervals
+            self.__interval_m2 += delta * (interval - self.__interval_mean)
+            self.__interval_min = min(self.__interval_min, interval)
+            self.__interval_max = max(self.__interval_max, interval)
+            self.__histogram[bisect_right(INTERVAL_BINS_MS, interval) - 1] += 1
+        self.__last_received = received
+
+        self.__decode_times[self.__decodes % self.decode_samples] = decode_time
+        self.__decodes += 1
+
+    def record_latency(self, stage: str, latency: float) -> None:
+        """Add a latency sample, in seconds, to one of LATENCY_STAGES."""
+        count = self.__latency_counts[stage]
+        self.__latencies[stage][count % self.decode_samples] = latency
+        self.__latency_counts[stage] = count + 1
+
+    def snapshot(self) -> dict:
+        """Summarize the stream so far as plain (JSON-serializable) values."""
+        decode_us = self.__decode_times[: min(self.__decodes, self.decode_samples)] * 1e6
+        if len(decode_us):
+            p50, p90, p99 = np.percentile(decode_us, [50, 90, 99]).tolist()
+            decode = {"p50": p50, "p90": p90, "p99": p99, "max": float(decode_us.max())}
+        else:
+            decode = {}
+
+        latency = {}
+        for stage in LATENCY_STAGES:
+            count = self.__latency_counts[stage]
+            if not count:
+                continue
+            latency_ms = self.__latencies[stage][: min(count, self.decode_samples)] * 1000
+            p50, p90, p99 = np.percentile(latency_ms, [50, 90, 99]).tolist()
+            latency[stage] = {
+                "samples": count,
+                "p50": p50,
+                "p90": p90,
+                "p99": p99,
+                "max": float(latency_ms.max()),
+            }
+
+        expected = 0
+        if self.__first_frame is not None:
+            expected = self.__last_frame - self.__first_frame + 1
+
+        if self.__intervals:
+            intervals = {
+                "mean": self.__interval_mean,
+                "std": sqrt(self.__interval_m2 / self.__intervals),
+                "min": self.__interval_min,
+                "max": self.__interval_max,
+            }
+        else:
+            intervals = {}
+
+        return {
+            "frames": self.__frames,
+            "expected_frames": expected,
+            "dropped": self.__dropped,
+            "drop_rate": self.__dropped / expected if expected else 0.0,
+            "gaps": self.__gaps,
+            "out_of_order": self.__out_of_order,
+            "first_frame": self.__first_frame,
+            "last_frame": self.__last_frame,
+            "interval_ms": intervals,
+            "interval_histogram": {
+                "bins_ms": list(INTERVAL_BINS_MS),
+                "counts": list(self.__histogram),
+            },
+            "decode_us": decode,
+            "latency_ms": latency,
+        }
+
+    def write(self, path: str) -> None:
+        """Write snapshot() to `path` as JSON."""
+        with open(path, "w") as file:
+            json.dump(self.snapshot(), file, indent=2)
@@ -0,0 +1,222 @@
+"""
+Synthetic NAT_FRAMEOFDATA generator for load and scaling tests.
+
+Produces frames in the NatNet 4.1 layout NatNetClient decodes: frame
+number, marker sets (the first labelled "hand", following a start ->
+center -> left/right target reach on a minimum-jerk profile), unlabeled
+markers, optional rigid body and labeled marker records, empty
+counts/sizes for the remaining data blocks, and the frame suffix.
+
+Serve them through MotiveStandIn at any rate:
+
+    python SyntheticMotive.py --rate 1000 --markers 40 --sets 4 --duration 30
+"""
+
+import argparse
+import struct
+import time
+from typing import Iterator, List, Tuple, Union
+
+import numpy as np
+
+from MotiveStreamDecoder import LABELED_MARKER_DTYPE, RIGID_BODY_DTYPE
+from MotiveStandIn import (
+    NAT_FRAMEOFDATA,
+    MotiveStandIn,
+    add_server_arguments,
+    pack_message,
+)
+
+_uint32 = struct.Struct("<I")
+_block = struct.Struct("<II")  # count, size
+
+# empty skeleton and asset blocks, then force plate and device blocks
+_EMPTY_PAIR = _block.pack(0, 0) * 2
+
+# timecode, timecode_sub, timestamp, camera mid-exposure, data received,
+# transmit, precision seconds, precision fraction, params
+_suffix = struct.Struct("<IIdQQQIIh")
+
+# reach waypoints in metres (x: left/right, y: height, z: depth)
+START = np.array([0.0, 0.8, 0.0])
+CENTER = np.array([0.0, 0.8, 0.25])
+TARGETS = {"left": np.array([-0.12, 0.8, 0.5]), "right": np.array([0.12, 0.8, 0.5])}
+
+
+def build_frame(
+    frame_number: int,
+    marker_sets: List[Tuple[str, np.ndarray]],
+    unlabeled: Union[np.ndarray, None] = None,
+    timestamp: float = 0.0,
+    rigid_bodies: Union[np.ndarray, None] = None,
+    labeled_markers: Union[np.ndarray, None] = None,
+    stamps: Tuple[int, int, int] = (0, 0, 0),
+) -> bytes:
+    """
+    Build a NAT_FRAMEOFDATA payload (without the message header).
+
+    Args:
+        frame_number (int): Frame number.
+        marker_sets (list): (label, (n, 3) positions) per marker set.
+        unlabeled (np.ndarray, optional): (n, 3) unlabeled marker positions.
+        timestamp (float, optional): Seconds since the stream started.
+        rigid_bodies (np.ndarray, optional): RIGID_BODY_DTYPE records.
+        labeled_markers (np.ndarray, optional): LABELED_MARKER_DTYPE records.
+        stamps (tuple, optional): Camera mid-exposure, camera data received and
+            transmit stamps, in server clock ticks.
+
+    Returns:
+        bytes: Frame payload
+    """
+    sets = b"".join(
+        label.encode("utf-8")
+        + b"\0"
+        + _uint32.pack(len(markers))
+        + np.asarray(markers, dtype="<f4").tobytes()
+        for label, markers in marker_sets
+    )
+
+    if unlabeled is None:
+        unlabeled = np.empty((0, 3))
+    unlabeled = np.asarray(unlabeled, dtype="<f4").tobytes()
+
+    if rigid_bodies is None:
+        rigid_bodies = np.zeros(0, dtype=RIGID_BODY_DTYPE)
+    if labeled_markers is None:
+        labeled_markers = np.zeros(0, dtype=LABELED_MARKER_DTYPE)
+
+    return b"".join(
+        [
+            _uint32.pack(frame_number),
+            _block.pack(len(marker_sets), len(sets)),
+            sets,
+            _block.pack(len(unlabeled) // 12, len(unlabeled)),
+            unlabeled,
+            _block.pack(len(rigid_bodies), rigid_bodies.nbytes),
+            rigid_bodies.tobytes(),
+            _EMPTY_PAIR,
+            _block.pack(len(labeled_markers), labeled_markers.nbytes),
+            labeled_markers.tobytes(),
+            _EMPTY_PAIR,
+            _suffix.pack(0, 0, timestamp, *stamps, 0, 0, 0),
+        ]
+    )
+
+
+def minimum_jerk(start: np.ndarray, end: np.ndarray, n: int) -> np.ndarray:
+    """Return n (x, y, z) samples of a minimum-jerk movement from start to end."""
+    tau = np.linspace(0.0, 1.0, n)[:, None]
+    return start + (end - start) * (10 * tau**3 - 15 * tau**4 + 6 * tau**5)
+
+
+def reach_trajectory(rate: int, movement_time: float = 0.5, dwell: float = 0.3) -> np.ndarray:
+    """
+    Build one cycle of hand-centroid positions: start -> center -> target -> start.
+
+    Targets alternate left then right, and each leg is separated by a dwell.
+    """
+    n_move = max(2, int(rate * movement_time))
+    n_dwell = max(1, int(rate * dwell))
+
+    legs = []
+    for target in TARGETS.values():
+        for a, b in [(START, CENTER), (CENTER, target), (target, START)]:
+            legs.append(minimum_jerk(a, b, n_move))
+            legs.append(np.repeat(b[None, :], n_dwell, axis=0))
+
+    return np.concatenate(legs)
+
+
+class SyntheticMotive(object):
+    """
+    Generates NAT_FRAMEOFDATA datagrams for a configurable tracking volume.
+
+    Attributes:
+        rate (int): Frame rate in Hz
+        n_markers (int): Markers per marker set
+        n_sets (int): Number of marker sets; the first is labelled "hand"
+        n_unlabeled (int): Unlabeled markers per frame
+    """
+
+    def __init__(
+        self,
+        rate: int = 240,
+        n_markers: int = 10,
+        n_sets: int = 1,
+        n_unlabeled: int = 0,
+        noise: float = 0.0005,
+        seed: int = 0,
+    ):
+        self.rate = rate
+        self.n_markers = n_markers
+        self.n_sets = n_sets
+        self.n_unlabeled = n_unlabeled
+        self.noise = noise
+
+        self.__rng = np.random.default_rng(seed)
+        self.__trajectory = reach_trajectory(rate)
+
+        # markers sit in a small cluster around each set's centroid
+        self.__offsets = self.__rng.normal(0.0, 0.01, (n_sets, n_markers, 3))
+        self.__anchors = self.__rng.uniform(-1.0, 1.0, (n_sets, 3))
+        self.__unlabeled = self.__rng.uniform(-1.0, 1.0, (n_unlabeled, 3))
+        self.__labels = ["hand"] + [f"set_{i}" for i in range(1, n_sets)]
+
+    def marker_sets(self, frame_number: int) -> List[Tuple[str, np.ndarray]]:
+        """Get (label, (n, 3) positions) for every marker set at a frame."""
+        hand = self.__trajectory[frame_number % len(self.__trajectory)]
+        centroids = self.__anchors.copy()
+        centroids[0] = hand
+
+        positions = centroids[:, None, :] + self.__offsets
+        if self.noise:
+            positions += self.__rng.normal(0.0, self.noise, positions.shape)
+
+        return list(zip(self.__labels, positions.astype(np.float32)))
+
+    def frame(self, frame_number: int) -> bytes:
+        """Build a complete NAT_FRAMEOFDATA datagram, stamped as transmitted when built."""
+        transmit = time.perf_counter_ns()
+        payload = build_frame(
+            frame_number,
+            self.marker_sets(frame_number),
+            self.__unlabeled,
+            frame_number / self.rate,
+            # nominal 3 ms camera and 1 ms Motive delays, in perf_counter_ns ticks
+            stamps=(transmit - 4_000_000, transmit - 1_000_000, transmit),
+        )
+        return pack_message(NAT_FRAMEOFDATA, payload)
+
+    def datagrams(self, n_frames: int, first_frame: int = 0) -> Iterator[Tuple[int, bytes]]:
+        """Yield (timestamp in ns, datagram) pairs spaced at the frame rate."""
+        period_ns = 1e9 / self.rate
+        for i in range(n_frames):
+            yield int(i * period_ns), self.frame(first_frame + i)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=int, default=240, help="frames per second")
+    parser.add_argument("--markers", type=int, default=10, help="markers per marker set")
+    parser.add_argument("--sets", type=int, default=1, help="number of marker sets")
+    parser.add_argument("--unlabeled", type=int, default=0, help="unlabeled markers")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to stream")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    generator = SyntheticMotive(args.rate, args.markers, args.sets, args.unlabeled)
+    server = MotiveStandIn(args.local_ip, args.command_port, args.data_port, args.multicast)
+    server.start()
+    try:
+        if not server.wait_for_client(args.wait):
+            raise SystemExit("No client connected.")
+
+        n_frames = int(args.duration * args.rate)
+        start = time.perf_counter()
+        sent = server.serve(generator.datagrams(n_frames))
+        elapsed = time.perf_counter() - start
+        print(f"sent {sent} frames in {elapsed:.2f}s ({sent / elapsed:,.0f}/s)")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
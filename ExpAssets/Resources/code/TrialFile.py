@@ -0,0 +1,151 @@
+"""
+Binary per-trial mocap file format.
+
+A trial file is a fixed-size header followed by packed, little-endian
+records, so np.memmap can open it without parsing anything:
+
+    offset  size  field
+    0       8     magic, b"OPTITRL\\0"
+    8       2     format version (uint16), currently 1
+    10      2     header size in bytes (uint16), HEADER_SIZE
+    12      2     record size in bytes (uint16)
+    14      2     markers per frame (uint16), 0 if unknown
+    16      8     sample rate in Hz (float64)
+    24      104   column layout: ASCII "name:dtype,..." (NUL padded)
+
+Records start at HEADER_SIZE. Each holds one marker: frame_number as
+int32, then pos_x, pos_y, pos_z as either float32 metres ("float32") or
+int32 micrometres ("int32_um"); the column layout says which. The record
+count is implied by the file size, so a recording can be read while it is
+still being written.
+
+    header, records = open_trial("trial_1_left_target.bin")
+"""
+
+import os
+from struct import Struct
+from typing import Tuple
+
+import numpy as np
+
+TRIAL_MAGIC = b"OPTITRL\0"
+TRIAL_VERSION = 1
+TRIAL_EXT = ".bin"
+HEADER_SIZE = 128
+
+_header = Struct("<8sHHHHd")
+_LAYOUT_SIZE = HEADER_SIZE - _header.size
+
+# Record layouts by position encoding
+POSITION_FORMATS = {
+    "float32": np.dtype(
+        [("frame_number", "<i4"), ("pos_x", "<f4"), ("pos_y", "<f4"), ("pos_z", "<f4")]
+    ),
+    "int32_um": np.dtype(
+        [("frame_number", "<i4"), ("pos_x", "<i4"), ("pos_y", "<i4"), ("pos_z", "<i4")]
+    ),
+}
+
+
+def pack_header(marker_count: int, sample_rate: float, position_format: str = "float32") -> bytes:
+    """
+    Build a trial file header.
+
+    Args:
+        marker_count (int): Markers per frame, or 0 if it varies / is unknown.
+        sample_rate (float): Capture rate in Hz.
+        position_format (str, optional): A key of POSITION_FORMATS. Defaults to "float32".
+
+    Returns:
+        bytes: HEADER_SIZE bytes
+    """
+    if position_format not in POSITION_FORMATS:
+        raise ValueError(
+            f"Position format must be one of {', '.join(POSITION_FORMATS)}; "
+            f"got '{position_format}'."
+        )
+
+    dtype = POSITION_FORMATS[position_format]
+    layout = ",".join(f"{name}:{dtype[name].str}" for name in dtype.names)
+
+    return _header.pack(
+        TRIAL_MAGIC, TRIAL_VERSION, HEADER_SIZE, dtype.itemsize, marker_count, sample_rate
+    ) + layout.encode("ascii").ljust(_LAYOUT_SIZE, b"\0")
+
+
+def read_header(path: str) -> dict:
+    """
+    Read and validate a trial file header.
+
+    Returns:
+        dict: version, header_size, marker_count, sample_rate and dtype (the record layout)
+    """
+    with open(path, "rb") as file:
+        raw = file.read(HEADER_SIZE)
+
+    if len(raw) < HEADER_SIZE or raw[: len(TRIAL_MAGIC)] != TRIAL_MAGIC:
+        raise ValueError(f"Not a binary trial file:\n{path}")
+
+    _, version, header_size, record_size, marker_count, sample_rate = _header.unpack_from(raw)
+    if version > TRIAL_VERSION:
+        raise ValueError(f"Unsupported trial file version {version}:\n{path}")
+
+    layout = raw[_header.size :].rstrip(b"\0").decode("ascii")
+    dtype = np.dtype([tuple(column.split(":")) for column in layout.split(",")])
+    if dtype.itemsize != record_size:
+        raise ValueError(f"Trial file column layout does not match its record size:\n{path}")
+
+    return {
+        "version": version,
+        "header_size": header_size,
+        "marker_count": marker_count,
+        "sample_rate": sample_rate,
+        "dtype": dtype,
+    }
+
+
+def open_trial(path: str) -> Tuple[dict, np.ndarray]:
+    """
+    Memory-map a trial file's records (read-only).
+
+    Any partly written trailing record is left out.
+
+    Returns:
+        tuple: (header dict, structured array of records)
+    """
+    header = read_header(path)
+    dtype = header["dtype"]
+    n_records = (os.path.getsize(path) - header["header_size"]) // dtype.itemsize
+
+    if n_records <= 0:
+        return header, np.zeros(0, dtype=dtype)
+
+    records = np.memmap(
+        path, dtype=dtype, mode="r", offset=header["header_size"], shape=(n_records,)
+    )
+    return header, records
+
+
+def to_records(
+    frame_numbers: np.ndarray, positions: np.ndarray, dtype: np.dtype
+) -> np.ndarray:
+    """Pack frame numbers and (n, 3) positions in metres into records of `dtype`."""
+    records = np.empty(len(frame_numbers), dtype=dtype)
+    records["frame_number"] = frame_numbers
+
+    integer = np.issubdtype(dtype["pos_x"], np.integer)
+    for axis, col in enumerate(["pos_x", "pos_y", "pos_z"]):
+        records[col] = np.rint(positions[:, axis] * 1e6) if integer else positions[:, axis]
+
+    return records
+
+
+def record_positions(records: np.ndarray) -> np.ndarray:
+    """Get the (n, 3) float64 marker positions of `records`, in metres."""
+    positions = np.column_stack([records["pos_x"], records["pos_y"], records["pos_z"]]).astype(
+        np.float64
+    )
+    if np.issubdtype(records.dtype["pos_x"], np.integer):
+        positions /= 1e6
+
+    return positions
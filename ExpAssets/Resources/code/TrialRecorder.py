@@ -0,0 +1,323 @@
+"""
+Buffered binary recorder for per-trial mocap data.
+
+Frames are appended to in-memory column buffers by the NatNet client's
+listener (on its FrameDispatcher worker); full chunks are packed and
+written by a background thread, so the listener never touches the
+filesystem.
+
+Recordings use the binary trial format described in TrialFile (a fixed
+header, then packed records that np.memmap opens directly); OptiTracker
+reads them as-is. to_csv() converts one to the CSV layout older tooling
+expects:
+
+    python TrialRecorder.py OptiData/<p_id>/testing/<block>/trial_1_left_target.bin
+"""
+
+import argparse
+import os
+from csv import writer as csv_writer
+from queue import Queue
+from threading import Event, Lock, Thread
+from typing import Union
+
+import numpy as np
+
+from TrialFile import (
+    POSITION_FORMATS,
+    TRIAL_EXT,
+    open_trial,
+    pack_header,
+    record_positions,
+    to_records,
+)
+
+
+class TrialRecorder(object):
+    """
+    Records marker positions for one trial at a time to a binary file.
+
+    Attributes:
+        chunk_size (int): Rows buffered in memory before handing off to the writer
+        marker_count (int): Markers per frame, written to each file's header; if 0,
+            each recording's header takes the marker count of its first frame
+        sample_rate (float): Capture rate in Hz, written to each file's header
+        position_format (str): Position encoding, a key of TrialFile.POSITION_FORMATS
+        path (str): File currently being recorded to, or None between trials
+
+    Methods:
+        begin(path): Start recording to a new file
+        append(frame_number, markers): Buffer one frame's markers
+        end(): Flush everything buffered and close the file
+        close(): End any open recording and stop the writer thread
+
+    A recording the writer thread fails on (e.g. its directory is missing)
+    is dropped from the failure on; end() raises the error once the rest of
+    the recording has been discarded.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 4096,
+        marker_count: int = 0,
+        sample_rate: float = 120,
+        position_format: str = "float32",
+    ):
+        """
+        Initialize the recorder and start its writer thread.
+
+        Args:
+            chunk_size (int, optional): Rows per write. Defaults to 4096.
+            marker_count (int, optional): Markers per frame; 0 to take it from each
+                recording's first frame. Defaults to 0.
+            sample_rate (float, optional): Capture rate in Hz. Defaults to 120.
+            position_format (str, optional): "float32" metres or "int32_um" micrometres.
+                Defaults to "float32".
+        """
+        # validates position_format
+        pack_header(marker_count, sample_rate, position_format)
+        self.__dtype = POSITION_FORMATS[position_format]
+
+        self.__chunk_size = chunk_size
+        self.__marker_count = marker_count
+        self.__sample_rate = sample_rate
+        self.__position_format = position_format
+        self.__path = None
+        # whether the current recording's file (and header) has been queued for writing
+        self.__opened = False
+        self.__lock = Lock()
+        self.__new_chunk()
+
+        # first exception raised on the writer thread, re-raised by end()
+        self.__error = None
+
+        self.__queue = Queue()
+        self.__writer = Thread(target=self.__write_chunks, daemon=True)
+        self.__writer.start()
+
+    @property
+    def chunk_size(self) -> int:
+        """Get the number of rows buffered per write."""
+        return self.__chunk_size
+
+    @property
+    def marker_count(self) -> int:
+        """Get the markers per frame recorded in file headers."""
+        return self.__marker_count
+
+    @property
+    def sample_rate(self) -> float:
+        """Get the sample rate recorded in file headers."""
+        return self.__sample_rate
+
+    @property
+    def position_format(self) -> str:
+        """Get the position encoding of recorded files."""
+        return self.__position_format
+
+    @property
+    def path(self) -> Union[str, None]:
+        """Get the file currently being recorded to."""
+        return self.__path
+
+    def begin(self, path: str) -> None:
+        """
+        Start recording to `path`, ending any recording still open.
+
+        Args:
+            path (str): Destination file; TRIAL_EXT is appended if missing.
+        """
+        if self.__path is not None:
+            self.end()
+
+        if not path.endswith(TRIAL_EXT):
+            path += TRIAL_EXT
+
+        # the file is opened with the first frame, which may set the header's marker count
+        with self.__lock:
+            self.__path = path
+            self.__opened = False
+
+    def append(self, frame_number: int, markers: np.ndarray) -> None:
+        """
+        Buffer a frame's markers; frames outside a recording are ignored.
+
+        Frames are stored in call order and readers search frame numbers as
+        sorted, so calls must come in frame order (e.g. from a FrameDispatcher
+        with a single worker).
+
+        Args:
+            frame_number (int): Motive frame number.
+            markers (np.ndarray): (n, 3) marker positions.
+        """
+        with self.__lock:
+            if self.__path is None:
+                return
+
+            if not self.__opened:
+                self.__open(len(markers))
+
+            rows = markers
+            while len(rows):
+                n = min(len(rows), self.__chunk_size - self.__fill)
+                stop = self.__fill + n
+
+                self.__frame_numbers[self.__fill : stop] = frame_number
+                self.__positions[self.__fill : stop] = rows[:n]
+                self.__fill = stop
+                rows = rows[n:]
+
+                if self.__fill == self.__chunk_size:
+                    self.__hand_off()
+
+    def end(self) -> None:
+        """
+        Flush buffered rows, close the file, and wait for the writer to finish.
+
+        Raises:
+            Exception: Whatever the writer thread failed with while recording
+                (e.g. OSError if the file could not be opened)
+        """
+        done = Event()
+        with self.__lock:
+            if self.__path is None:
+                return
+
+            # a recording without frames still gets its (header-only) file
+            if not self.__opened:
+                self.__open(self.__marker_count)
+
+            self.__hand_off()
+            self.__path = None
+            self.__queue.put(("close", done))
+
+        done.wait()
+
+        error, self.__error = self.__error, None
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        """End any open recording and stop the writer thread."""
+        try:
+            self.end()
+        finally:
+            self.__queue.put(("stop", None))
+            self.__writer.join()
+
+    def __open(self, marker_count: int) -> None:
+        # called with the lock held
+        header = pack_header(
+            self.__marker_count or marker_count, self.__sample_rate, self.__position_format
+        )
+        self.__queue.put(("open", (self.__path, header)))
+        self.__opened = True
+
+    def __new_chunk(self) -> None:
+        self.__frame_numbers = np.empty(self.__chunk_size, dtype=np.int32)
+        self.__positions = np.empty((self.__chunk_size, 3), dtype=np.float32)
+        self.__fill = 0
+
+    def __hand_off(self) -> None:
+        # called with the lock held; the writer owns the arrays from here on
+        if self.__fill:
+            self.__queue.put(
+                ("write", (self.__frame_numbers, self.__positions, self.__fill))
+            )
+            self.__new_chunk()
+
+    def __write_chunks(self) -> None:
+        file = None
+        while True:
+            action, payload = self.__queue.get()
+
+            try:
+                if action == "open":
+                    path, header = payload
+                    file = open(path, "wb")
+                    file.write(header)
+
+                elif action == "write":
+                    # chunks of a recording that already failed are dropped
+                    if file is not None:
+                        frame_numbers, positions, n = payload
+                        file.write(
+                            to_records(frame_numbers[:n], positions[:n], self.__dtype).tobytes()
+                        )
+
+                elif action == "close":
+                    if file is not None:
+                        file.close()
+                    file = None
+
+                elif action == "stop":
+                    return
+
+            except Exception as e:
+                # the writer must outlive a failed recording; end() reports it
+                if self.__error is None:
+                    self.__error = e
+                if file is not None:
+                    try:
+                        file.close()
+                    except OSError:
+                        pass
+                file = None
+
+            finally:
+                if action == "close":
+                    payload.set()
+
+
+def read_recording(path: str) -> np.ndarray:
+    """Load a binary trial recording's records into memory (see TrialFile.open_trial)."""
+    _, records = open_trial(path)
+    return np.array(records)
+
+
+def to_csv(path: str, csv_path: str = "") -> str:
+    """
+    Convert a binary trial recording to the frame_number,pos_x,pos_y,pos_z CSV layout.
+
+    Args:
+        path (str): Binary recording.
+        csv_path (str, optional): Output file. Defaults to `path` without TRIAL_EXT.
+
+    Returns:
+        str: Path of the written CSV file
+    """
+    if csv_path == "":
+        if path.endswith(TRIAL_EXT):
+            csv_path = path[: -len(TRIAL_EXT)]
+        else:
+            csv_path = path + ".csv"
+
+    records = read_recording(path)
+    positions = record_positions(records)
+
+    with open(csv_path, "w", newline="") as file:
+        writer = csv_writer(file)
+        writer.writerow(records.dtype.names)
+        writer.writerows(zip(records["frame_number"].tolist(), *positions.T.tolist()))
+
+    return csv_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert binary trial recordings to CSV.")
+    parser.add_argument("recordings", nargs="+", help="Binary recording file(s) or directories")
+    args = parser.parse_args()
+
+    for target in args.recordings:
+        if os.path.isdir(target):
+            paths = [
+                os.path.join(root, f)
+                for root, _, files in os.walk(target)
+                for f in files
+                if f.endswith(TRIAL_EXT)
+            ]
+        else:
+            paths = [target]
+
+        for path in sorted(paths):
+            print(to_csv(path))
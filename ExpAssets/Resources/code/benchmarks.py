@@ -0,0 +1,367 @@
+"""
+Micro-benchmarks for the mocap pipeline.
+
+Run from this directory, e.g.:
+
+    python benchmarks.py decode --markers 40 --sets 2
+    python benchmarks.py scaling --rates 240 1000 2000 --markers 10 50 200
+    python benchmarks.py centroids --rows 1000 10000 100000 1000000
+    python benchmarks.py query --frames 1000 10000 100000
+    python benchmarks.py recv --packets 200000 --markers 40
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Union
+
+import numpy as np
+
+from MotiveStreamParser import MotiveStreamParser
+from OptiTracker import OptiTracker, frame_centroids
+from SyntheticMotive import SyntheticMotive, build_frame
+from natnetclient_rough import NatNetClient
+
+
+def build_frames(n_frames: int, n_sets: int = 1, n_markers: int = 10) -> list:
+    """Build NAT_FRAMEOFDATA payloads (sans message header) from SyntheticMotive."""
+    generator = SyntheticMotive(n_markers=n_markers, n_sets=n_sets)
+    return [build_frame(i, generator.marker_sets(i)) for i in range(n_frames)]
+
+
+def _decode_with_parser(stream: bytes) -> None:
+    # mirrors the construct-based path NatNetClient used before MotiveStreamDecoder
+    parser = MotiveStreamParser(stream)
+    prefix = parser.parse("frame_number")
+    n_marker_sets = parser.parse("count")
+    _ = parser.parse("size")
+
+    for _ in range(n_marker_sets):
+        marker_set = {"label": parser.parse("label"), "markers": []}
+        for _ in range(parser.parse("count")):
+            marker = parser.parse("unlabeled_marker")
+            marker["frame_number"] = prefix
+            marker_set["markers"].append(marker)
+
+
+def _client_decoder(marker_sets: Union[list, None] = None) -> Callable:
+    # NatNetClient's own frame path, minus the sockets
+    client = NatNetClient()
+    client.markers_listener = lambda marker_set: None
+    client.subscribe(marker_sets=marker_sets, blocks=["marker_sets"])
+    return lambda stream: client._NatNetClient__unpack_data(stream)
+
+
+def _packets_per_second(decode: Callable, packets: list, min_time: float = 1.0) -> float:
+    n = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        for packet in packets:
+            decode(packet)
+        n += len(packets)
+        elapsed = time.perf_counter() - start
+    return n / elapsed
+
+
+def bench_decode(n_markers: int, n_sets: int, min_time: float) -> None:
+    packets = build_frames(100, n_sets, n_markers)
+
+    print(f"decode: {n_sets} marker set(s) x {n_markers} markers")
+    for name, decode in [
+        ("MotiveStreamParser", _decode_with_parser),
+        ("MotiveStreamDecoder", _client_decoder()),
+        ("subscribed: hand", _client_decoder(["hand"])),
+    ]:
+        rate = _packets_per_second(decode, packets, min_time)
+        print(f"  {name:<20} {rate:>12,.0f} packets/s")
+
+
+def _run_client(rate: int, n_markers: int, n_sets: int, duration: float, port: int) -> dict:
+    # the server runs in its own process so it doesn't compete for our GIL
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "SyntheticMotive.py"),
+            f"--rate={rate}",
+            f"--markers={n_markers}",
+            f"--sets={n_sets}",
+            f"--duration={duration}",
+            f"--command-port={port}",
+            f"--data-port={port + 1}",
+            "--wait=5",
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    time.sleep(0.5)
+
+    frame_numbers = []
+    client = NatNetClient(
+        {"use_multicast": False, "command_port": port, "data_port": port + 1}
+    )
+    client.markers_listener = lambda marker_set: (
+        frame_numbers.append(marker_set["frame_number"])
+        if marker_set["label"] == "hand"
+        else None
+    )
+    client.startup()
+
+    server_output, _ = server.communicate(timeout=duration + 30)
+    time.sleep(0.2)
+    stats = client.stats()
+    client.shutdown()
+
+    expected = int(duration * rate)
+    return {
+        "received": len(set(frame_numbers)),
+        "expected": expected,
+        "dropped": expected - len(set(frame_numbers)),
+        "decode_p99_us": stats["decode_us"].get("p99", float("nan")),
+        "server": server_output.strip(),
+    }
+
+
+def bench_scaling(rates: list, marker_counts: list, n_sets: int, duration: float, port: int) -> None:
+    print(f"scaling: {n_sets} marker set(s), {duration}s per run")
+    print(
+        f"  {'rate':>6} {'markers':>8} {'received':>9} {'dropped':>8} {'drop %':>7} "
+        f"{'p99 decode':>11}"
+    )
+    for rate in rates:
+        for n_markers in marker_counts:
+            result = _run_client(rate, n_markers, n_sets, duration, port)
+            pct = 100 * result["dropped"] / result["expected"]
+            print(
+                f"  {rate:>6} {n_markers:>8} {result['received']:>9} "
+                f"{result['dropped']:>8} {pct:>6.2f}% {result['decode_p99_us']:>9.1f}us"
+                f"   ({result['server']})"
+            )
+
+
+def build_rows(n_rows: int, n_markers: int = 10, missing: float = 0.05) -> np.ndarray:
+    """Build trial-file rows (frame_number, pos_x/y/z) with some markers missing."""
+    rng = np.random.default_rng(0)
+    frame_numbers = np.repeat(np.arange(n_rows // n_markers + 1), n_markers)[:n_rows]
+    keep = rng.random(n_rows) >= missing
+
+    rows = np.zeros(
+        int(keep.sum()),
+        dtype=[("frame_number", "i8"), ("pos_x", "f8"), ("pos_y", "f8"), ("pos_z", "f8")],
+    )
+    rows["frame_number"] = frame_numbers[keep]
+    for col in ["pos_x", "pos_y", "pos_z"]:
+        rows[col] = rng.normal(0.0, 1000.0, n_rows)[keep]
+    return rows
+
+
+def _centroids_by_mask(frames: np.ndarray) -> np.ndarray:
+    # the per-frame boolean-mask loop OptiTracker.__column_means used before frame_centroids
+    start = min(frames["frame_number"])
+    stop = max(frames["frame_number"]) + 1
+    means = np.zeros(stop - start, dtype=frames.dtype)
+
+    for frame_number in range(start, stop):
+        this_frame = frames[frames["frame_number"] == frame_number,]
+        idx = frame_number - start
+        means[idx]["frame_number"] = frame_number
+        means[idx]["pos_x"] = np.mean(this_frame["pos_x"])
+        means[idx]["pos_y"] = np.mean(this_frame["pos_y"])
+        means[idx]["pos_z"] = np.mean(this_frame["pos_z"])
+
+    return means
+
+
+def bench_centroids(row_counts: list, n_markers: int, mask_limit: int) -> None:
+    print(f"centroids: {n_markers} markers per frame, ~5% missing")
+    print(f"  {'rows':>9} {'mask loop':>12} {'frame_centroids':>16}")
+    for n_rows in row_counts:
+        rows = build_rows(n_rows, n_markers)
+        timings = []
+        for compute, limit in [(_centroids_by_mask, mask_limit), (frame_centroids, None)]:
+            if limit is not None and n_rows > limit:
+                timings.append("skipped")
+                continue
+            start = time.perf_counter()
+            compute(rows)
+            timings.append(f"{(time.perf_counter() - start) * 1000:.2f} ms")
+        print(f"  {n_rows:>9} {timings[0]:>12} {timings[1]:>16}")
+
+
+def write_trial_csv(path: str, n_frames: int, n_markers: int = 10) -> None:
+    rows = build_rows(n_frames * n_markers, n_markers, missing=0.0)
+    with open(path, "w", newline="") as file:
+        file.write("frame_number,pos_x,pos_y,pos_z\n")
+        # rows are in mm; trial files are in metres
+        columns = [rows["frame_number"]] + [rows[c] / 1000 for c in ["pos_x", "pos_y", "pos_z"]]
+        np.savetxt(
+            file, np.column_stack(columns), fmt=["%d", "%.6f", "%.6f", "%.6f"], delimiter=","
+        )
+
+
+def bench_query(frame_counts: list, window: int, repeats: int) -> None:
+    print(f"query: {window} frames of a growing trial file, best of {repeats}")
+    print(f"  {'frames':>9} {'full parse':>12} {'tail seek':>12} {'mid window':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_frames in frame_counts:
+            path = os.path.join(tmp, f"trial_{n_frames}")
+            write_trial_csv(path, n_frames)
+
+            tracker = OptiTracker(marker_count=10, window_size=window, data_dir=path)
+            query = tracker._OptiTracker__query_frames
+
+            def full_parse():
+                # the whole-file read __query_frames did before seeking from EOF
+                data = np.genfromtxt(path, delimiter=",", names=True)
+                return data[data["frame_number"] > data["frame_number"][-1] - window]
+
+            def mid_window():
+                middle = n_frames // 2
+                return tracker.window(middle, middle + window - 1)
+
+            timings = []
+            for run in (full_parse, query, mid_window):
+                best = float("inf")
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    run()
+                    best = min(best, time.perf_counter() - start)
+                timings.append(f"{best * 1000:.2f} ms")
+
+            print(f"  {n_frames:>9} {timings[0]:>12} {timings[1]:>12} {timings[2]:>12}")
+
+
+def _blast(port: int, n_packets: int, n_markers: int, n_sets: int) -> None:
+    # runs in a child process: send frames as fast as the socket takes them
+    generator = SyntheticMotive(n_markers=n_markers, n_sets=n_sets)
+    packets = [generator.frame(i) for i in range(100)]
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for i in range(n_packets):
+        sock.sendto(packets[i % len(packets)], ("127.0.0.1", port))
+    sock.close()
+
+
+def _receive(
+    mode: str, n_packets: int, n_markers: int, n_sets: int, port: int, trace: bool = False
+) -> dict:
+    client = NatNetClient({"dispatch_queue_size": 0})
+    client.markers_listener = lambda marker_set: None
+    receive_batch = client._NatNetClient__receive_batch
+    buffers = [bytearray(64 * 1024) for _ in range(client.settings["recv_batch"])]
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    sock.bind(("127.0.0.1", port))
+    sender = multiprocessing.Process(target=_blast, args=(port, n_packets, n_markers, n_sets))
+    sender.start()
+
+    received = 0
+    start = last = None
+    blocks = sys.getallocatedblocks()
+    if trace:
+        tracemalloc.start()
+    try:
+        while True:
+            if mode == "recvfrom":
+                # the receive path before recv_into: a fresh 64 KB bytes per packet
+                sock.settimeout(1.0)
+                try:
+                    bytestream, _ = sock.recvfrom(64 * 1024)
+                except socket.timeout:
+                    break
+                client.process_datagram(bytestream)
+                received += 1
+            else:
+                sock.setblocking(False)
+                try:
+                    batch = receive_batch(sock, buffers, 1.0)
+                except socket.timeout:
+                    break
+                for buffer, n_bytes, received_ns in batch:
+                    client.process_datagram(buffer, received_ns, n_bytes)
+                received += len(batch)
+
+            last = time.perf_counter()
+            if start is None:
+                start = last
+    finally:
+        peak = tracemalloc.get_traced_memory()[1] if trace else 0
+        tracemalloc.stop()
+        sender.join()
+        sock.close()
+
+    return {
+        "received": received,
+        "rate": received / (last - start) if received > 1 else 0.0,
+        "peak_kb": peak / 1024,
+        "blocks": sys.getallocatedblocks() - blocks,
+    }
+
+
+def bench_recv(n_packets: int, n_markers: int, n_sets: int, port: int) -> None:
+    print(f"recv: {n_packets} packets of {n_sets} set(s) x {n_markers} markers, loopback blast")
+    print("  (peak traced allocation comes from a second, tracemalloc-instrumented run)")
+    print(f"  {'mode':<12} {'received':>9} {'packets/s':>11} {'peak alloc':>11} {'net blocks':>11}")
+    for mode in ("recvfrom", "recv_into"):
+        result = _receive(mode, n_packets, n_markers, n_sets, port)
+        traced = _receive(mode, n_packets, n_markers, n_sets, port, trace=True)
+        print(
+            f"  {mode:<12} {result['received']:>9} {result['rate']:>11,.0f} "
+            f"{traced['peak_kb']:>8.1f} KB {result['blocks']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    decode = commands.add_parser("decode", help="NAT_FRAMEOFDATA decode throughput")
+    decode.add_argument("--markers", type=int, default=40)
+    decode.add_argument("--sets", type=int, default=1)
+    decode.add_argument("--min-time", type=float, default=1.0)
+
+    scaling = commands.add_parser(
+        "scaling", help="frames dropped by NatNetClient against a SyntheticMotive server"
+    )
+    scaling.add_argument("--rates", type=int, nargs="+", default=[120, 240, 500, 1000])
+    scaling.add_argument("--markers", type=int, nargs="+", default=[10, 50, 200])
+    scaling.add_argument("--sets", type=int, default=1)
+    scaling.add_argument("--duration", type=float, default=5.0)
+    scaling.add_argument("--port", type=int, default=15510)
+
+    centroids = commands.add_parser("centroids", help="per-frame marker centroid computation")
+    centroids.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    centroids.add_argument("--markers", type=int, default=10)
+    centroids.add_argument(
+        "--mask-limit", type=int, default=100000, help="largest row count to run the old loop on"
+    )
+
+    query = commands.add_parser("query", help="OptiTracker windowed file query latency")
+    query.add_argument("--frames", type=int, nargs="+", default=[1000, 10000, 100000])
+    query.add_argument("--window", type=int, default=5)
+    query.add_argument("--repeats", type=int, default=3)
+
+    recv = commands.add_parser("recv", help="socket receive path throughput and allocation")
+    recv.add_argument("--packets", type=int, default=100000)
+    recv.add_argument("--markers", type=int, default=40)
+    recv.add_argument("--sets", type=int, default=1)
+    recv.add_argument("--port", type=int, default=15530)
+
+    args = parser.parse_args()
+
+    if args.command == "decode":
+        bench_decode(args.markers, args.sets, args.min_time)
+    elif args.command == "scaling":
+        bench_scaling(args.rates, args.markers, args.sets, args.duration, args.port)
+    elif args.command == "centroids":
+        bench_centroids(args.rows, args.markers, args.mask_limit)
+    elif args.command == "query":
+        bench_query(args.frames, args.window, args.repeats)
+    elif args.command == "recv":
+        bench_recv(args.packets, args.markers, args.sets, args.port)
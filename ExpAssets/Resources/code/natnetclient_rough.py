@@ -15,17 +15,31 @@
 
 # OptiTrack NatNet direct depacketization library for Python 3.x
 
+import select
 import socket
 import struct
 import time
-from threading import Thread
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Condition, Lock, Thread, Timer
 from typing import Any, Callable, List, Tuple, Union
 
 # import os
 # print(os.getcwd())
 # quit()
 
-from MotiveStreamParser import MotiveStreamParser
+from FrameDispatcher import FrameDispatcher
+from ModelDescriptions import DescriptionCache, FrameLayout, unpack_descriptions
+from MotiveCapture import CaptureWriter
+from MotiveStreamDecoder import (
+    BLOCK_HEADER_SIZE,
+    FRAME_BLOCKS,
+    SIZED_BLOCKS_VERSION,
+    MotiveStreamDecoder,
+)
+from StreamStats import StreamStats
 
 def trace(*args):
     # uncomment the one you want to use
@@ -78,10 +92,26 @@ class NatNetClient:
             "nat_net_requested_version": [0, 0, 0, 0],
             # server stream version. This will be updated to the actual version the server is using during initialization.
             "server_version": [0, 0, 0, 0],
+            # Ticks per second of the server clock frame suffix stamps use; updated during initialization
+            "high_res_clock_frequency": 0,
             # Lock values once run is called
             "is_locked": False,
             # Server has the ability to change bitstream version
             "can_change_bitstream_version": False,
+            # Listener calls queued for off-thread dispatch; 0 calls them on the data thread
+            "dispatch_queue_size": 1024,
+            # What to do when the dispatch queue is full: block, drop_oldest or drop_newest
+            "dispatch_policy": "drop_oldest",
+            # Threads draining the dispatch queue; 1 preserves frame order
+            "dispatch_workers": 1,
+            # Write each segment's stream statistics to <segment>.stats.json on end_segment()
+            "segment_stats": False,
+            # Receive buffers per socket; up to this many queued datagrams are drained per wakeup
+            "recv_batch": 16,
+            # JSON file model descriptions are cached in between sessions; None disables it
+            "description_cache": None,
+            # Seconds to wait for descriptions requested when the asset set changes
+            "description_timeout": 1.0,
         }
 
         self.settings.update(instance_settings)
@@ -101,6 +131,37 @@ class NatNetClient:
 
         self.description_listener = None
 
+        # Marker set label -> FrameRingBuffer written by the data thread, its only writer
+        self.frame_buffers = {}
+
+        # Marker set label -> frames with markers received this segment, see wait_for_frames()
+        self.frame_counts = {}
+        self.frame_counted = Condition()
+
+        # (expected reply message ids, Future) per request awaiting a reply, oldest first;
+        # NatNet replies carry no request id, so they are matched in order
+        self.pending_requests = deque()
+        self.request_lock = Lock()
+
+        # Future resolved with the server info dict once NAT_CONNECT is answered
+        self.server_info = None
+
+        # Latest NAT_MODELDEF marker set / rigid body descriptions, and the marker set
+        # block layout they imply (see ModelDescriptions); None until described
+        self.descriptions = None
+        self.frame_layout = None
+        # Asset list (marker set labels and sizes) last seen in a frame off the layout
+        self.described_signature = None
+        # Set when the frame suffix reports changed models, so the cache is bypassed
+        self.descriptions_stale = False
+        # Future of the NAT_REQUEST_MODELDEF sent for described_signature, if any
+        self.description_request = None
+        self.__models_changed = False
+
+        # (marker set labels, data blocks) to decode; None labels means all sets
+        self.subscriptions = (None, frozenset(FRAME_BLOCKS))
+
+        self.dispatcher = None
         self.command_thread = None
         self.data_thread = None
         self.command_socket = None
@@ -108,6 +169,20 @@ class NatNetClient:
 
         self.stop_threads = False
 
+        # Name of the recording segment (e.g., trial) frames currently belong to
+        self.segment = None
+
+        # CaptureWriter for raw datagrams, see start_capture()
+        self.capture = None
+
+        # Frame continuity / timing statistics, for the session and current segment
+        self.session_stats = StreamStats()
+        self.segment_stats = StreamStats()
+
+        # Smallest local receive time minus server transmit time seen, in seconds;
+        # the clocks are not synchronized, so network latency is measured from it
+        self.clock_offset = None
+
     # Constants corresponding to Client/server message ids
     NAT_CONNECT = 0
     NAT_SERVERINFO = 1
@@ -123,63 +198,338 @@ class NatNetClient:
     NAT_UNRECOGNIZED_REQUEST = 100
     NAT_UNDEFINED = 999999.9999
 
-    def __unpack_data(self, stream: bytes, stream_version: List[int] = []) -> int:
-        parser = MotiveStreamParser(stream)
+    def __unpack_data(
+        self,
+        stream: bytes,
+        offset: int = 0,
+        received: float = 0.0,
+        stream_version: Union[List[int], None] = None,
+        end: Union[int, None] = None,
+    ) -> int:
+        decode_start = time.perf_counter()
+        parser = MotiveStreamDecoder(stream, offset, end)
         prefix = parser.parse("frame_number")
+        # read once so every set in a frame lands in the same segment
+        segment = self.segment
+        if stream_version is None:
+            stream_version = self.__stream_version()
+
+        # (listener, payload) calls, made once the frame suffix has been read
+        pending = []
+        labels, blocks = self.subscriptions
+        # blocks past the last subscribed one are only skipped over, by size,
+        # to reach the frame suffix after them
+        last_block = max(
+            (i for i, block in enumerate(FRAME_BLOCKS) if block in blocks), default=-1
+        )
+        # before 4.1 blocks have no size to skip by, so only marker sets are
+        # read and the suffix (with its timing) is out of reach
+        sized = tuple(stream_version[:2]) >= SIZED_BLOCKS_VERSION
+        if not sized:
+            last_block = min(last_block, FRAME_BLOCKS.index("marker_sets"))
+
+        for block in FRAME_BLOCKS[: last_block + 1]:
+            # truncated streams may end before the later blocks
+            if parser.remaining() < BLOCK_HEADER_SIZE:
+                break
+
+            if block not in blocks:
+                parser.skip_block()
+
+            elif block == "marker_sets":
+                n_marker_sets = parser.parse("count")
+                size = parser.parse("size")
+
+                layout = self.frame_layout
+                if layout is not None and layout.matches(parser, n_marker_sets, size):
+                    # described asset set: slice each set out without reading labels
+                    block_start = parser.tell()
+                    for set_label, markers_offset, n_markers_in_set in layout.marker_sets:
+                        if labels is None or set_label in labels:
+                            self.__deliver_marker_set(
+                                set_label,
+                                prefix,
+                                segment,
+                                received,
+                                parser.markers_at(block_start + markers_offset, n_markers_in_set),
+                                pending,
+                            )
+                    parser.seek(size)
+                    continue
+
+                signature = []
+                for _ in range(0, n_marker_sets):
+                    set_label = parser.parse("label")
+                    n_markers_in_set = parser.parse("count")
+                    signature.append((set_label, n_markers_in_set))
+
+                    if labels is not None and set_label not in labels:
+                        parser.seek(parser.sizeof("unlabeled_marker", n_markers_in_set))
+                        continue
+
+                    self.__deliver_marker_set(
+                        set_label,
+                        prefix,
+                        segment,
+                        received,
+                        parser.parse_markers(n_markers_in_set),
+                        pending,
+                    )
+
+                self.__describe_assets(tuple(signature))
+
+            elif block == "rigid_bodies" and self.rigid_bodies_listener is not None:
+                rigid_bodies = parser.parse_rigid_bodies()
+                if rigid_bodies is not None:
+                    pending.append(
+                        (
+                            self.rigid_bodies_listener,
+                            {
+                                "frame_number": prefix,
+                                "segment": segment,
+                                "received": received,
+                                "rigid_bodies": rigid_bodies,
+                            },
+                        )
+                    )
+
+            elif block == "labeled_markers" and self.labeled_markers_listener is not None:
+                labeled_markers = parser.parse_labeled_markers()
+                if labeled_markers is not None:
+                    pending.append(
+                        (
+                            self.labeled_markers_listener,
+                            {
+                                "frame_number": prefix,
+                                "segment": segment,
+                                "received": received,
+                                "labeled_markers": labeled_markers,
+                            },
+                        )
+                    )
+
+            elif block == "legacy_markers" and self.legacy_markers_listener is not None:
+                n_legacy_markers = parser.parse("count")
+                _ = parser.parse("size")
+
+                pending.append(
+                    (
+                        self.legacy_markers_listener,
+                        {
+                            "frame_number": prefix,
+                            "segment": segment,
+                            "received": received,
+                            "markers": parser.parse_markers(n_legacy_markers),
+                        },
+                    )
+                )
+
+            else:
+                # no listener, or not decoded yet
+                parser.skip_block()
+
+        timing = None
+        if sized:
+            parser.skip_blocks(len(FRAME_BLOCKS) - last_block - 1)
+            # None if the frame was truncated before (or within) the suffix
+            timing = parser.parse_suffix()
+
+        if timing is not None:
+            # on the frame Motive's tracked models change, the layout may no longer hold
+            if timing["tracked_models_changed"] and not self.__models_changed:
+                self.__invalidate_descriptions()
+            self.__models_changed = timing["tracked_models_changed"]
+
+            self.__record_timing(timing, received, segment)
+            if self.suffix_listener is not None:
+                pending.append(
+                    (
+                        self.suffix_listener,
+                        {"frame_number": prefix, "segment": segment, "received": received},
+                    )
+                )
+
+        for listener, payload in pending:
+            # frame suffix: timecode, timestamps and params
+            payload["timing"] = timing
+            self.__dispatch(listener, payload)
+
+        decode_time = time.perf_counter() - decode_start
+        self.session_stats.record(prefix, received, decode_time)
+        if segment is not None:
+            self.segment_stats.record(prefix, received, decode_time)
 
-        n_marker_sets = parser.parse("count")
-        _ = parser.parse("size")
-
-        # TODO: Pointer() might aide skipping
-        for _ in range(0, n_marker_sets):
-            set_label = parser.parse("label")
-
-            marker_set = {"label": set_label, "markers": []}
-
-            n_markers_in_set = parser.parse("count")
-
-            for _ in range(n_markers_in_set):
-                marker = parser.parse("unlabeled_marker")
-                marker["frame_number"] = prefix
-                marker_set["markers"].append(marker)
-
-            self.markers_listener(marker_set)
-
-        # n_legacy_markers = parser.parse("count")
-        # _ = parser.parse("size")
-        #
-        # legacy_markers = []
-        # for _ in range(n_legacy_markers):
-        #     legacy_marker = parser.parse("legacy_marker")
-        #     legacy_marker["frame"] = prefix["frame"]
-        #     legacy_markers.append(legacy_marker)
-        #
-        # self.legacy_markers_listener(legacy_markers)
-        #
-        # n_rigid_bodies = parser.parse("count")
-        # _ = parser.parse("size")
-        #
-        # rigid_bodies = []
-        # for _ in range(n_rigid_bodies):
-        #     rigid_body = parser.parse("rigid_body")
-        #     rigid_body["frame"] = prefix["frame"]
-        #     rigid_bodies.append(rigid_body)
-        #
-        # self.rigid_bodies_listener(rigid_bodies)
-
-        return parser.tell()
+        return parser.tell() - offset
+
+    def __stream_version(self) -> Tuple[int, ...]:
+        # the version in use; frames are taken to be NatNet 4.1 until the server says
+        version = self.settings["nat_net_requested_version"]
+        if not any(version[:2]):
+            version = self.settings["nat_net_stream_version_server"]
+        if not any(version[:2]):
+            version = (4, 1, 0, 0)
+        return tuple(version)
+
+    def __deliver_marker_set(
+        self,
+        set_label: str,
+        prefix: int,
+        segment: Union[str, None],
+        received: float,
+        markers,
+        pending: list,
+    ) -> None:
+        frame_buffer = self.frame_buffers.get(set_label)
+        if frame_buffer is not None:
+            frame_buffer.write(prefix, received, markers)
+
+        if len(markers):
+            with self.frame_counted:
+                self.frame_counts[set_label] = self.frame_counts.get(set_label, 0) + 1
+                self.frame_counted.notify_all()
+
+        if self.markers_listener is not None:
+            marker_set = {
+                "label": set_label,
+                "frame_number": prefix,
+                "segment": segment,
+                "received": received,
+                # (n, 3) float32 view over the packet; x, y, z per row
+                "markers": markers,
+            }
+            pending.append((self.markers_listener, marker_set))
 
     # Functions for unpacking descriptions, called by __unpack_descriptions #
     # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
-    def __unpack_descriptions(
-        self, bytestream: bytes, stream_version: List[int] = None
-    ) -> int:
-        pass
+    def __unpack_descriptions(self, bytestream: bytes, offset: int) -> int:
+        try:
+            descriptions, end = unpack_descriptions(bytestream, offset, self.__stream_version())
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            self.__resolve_request(self.NAT_MODELDEF, RuntimeError(str(e)))
+            return len(bytestream)
+
+        self.__set_descriptions(descriptions)
+        if self.settings["description_cache"]:
+            try:
+                DescriptionCache(self.settings["description_cache"]).put(
+                    self.settings["server_version"], descriptions
+                )
+            except OSError as e:
+                print(f"WARNING: could not cache model descriptions: {e!r}")
+
+        self.__resolve_request(self.NAT_MODELDEF, descriptions)
+        if self.description_listener is not None:
+            self.description_listener(descriptions)
+
+        return end
+
+    def __set_descriptions(self, descriptions: dict) -> None:
+        # both are read by the data thread; the layout is swapped in last
+        self.descriptions = descriptions
+        self.frame_layout = FrameLayout.from_descriptions(descriptions)
+        self.descriptions_stale = False
+
+    def __invalidate_descriptions(self) -> None:
+        # back to reading labels until descriptions are re-requested from the server
+        self.frame_layout = None
+        self.described_signature = None
+        self.descriptions_stale = True
+
+    def __describe_assets(self, signature: tuple) -> None:
+        """Find descriptions for a frame's asset list when the layout does not cover it."""
+        if signature == self.described_signature:
+            return
+
+        # the cache is keyed by server version, and requests need the server
+        if self.command_socket is None or not any(self.settings["server_version"]):
+            return
+        self.described_signature = signature
+
+        if self.settings["description_cache"] and not self.descriptions_stale:
+            cached = DescriptionCache(self.settings["description_cache"]).get(
+                self.settings["server_version"], signature
+            )
+            if cached is not None:
+                self.__set_descriptions(cached)
+                return
+
+        # a reply to the last asset set's request would describe assets no longer streamed
+        if self.description_request is not None:
+            self.cancel_request(self.description_request)
+
+        # the asset set is new or has changed; the layout is replaced once Motive replies.
+        # An unanswered request is withdrawn after a timeout, or it would be matched
+        # against the replies to later requests
+        future = self.request(self.NAT_REQUEST_MODELDEF)
+        timer = Timer(self.settings["description_timeout"], self.cancel_request, (future,))
+        timer.daemon = True
+        timer.start()
+        future.add_done_callback(lambda _: timer.cancel())
+        self.description_request = future
 
     # Private Utility functions #
     # # # # # # # # # # # # # # #
 
+    def __dispatch(self, listener: Callable, payload: dict) -> None:
+        if self.dispatcher is None:
+            self.__call_listener(listener, payload)
+        else:
+            # markers view a receive buffer that is reused once this call returns
+            if "markers" in payload:
+                payload["markers"] = payload["markers"].copy()
+            self.dispatcher.submit(partial(self.__call_listener, listener), payload)
+
+    def __call_listener(self, listener: Callable, payload: dict) -> None:
+        latency = time.perf_counter() - payload["received"]
+        self.session_stats.record_latency("receive_to_listener", latency)
+        if payload["segment"] is not None:
+            self.segment_stats.record_latency("receive_to_listener", latency)
+        listener(payload)
+
+    def __record_timing(self, timing: dict, received: float, segment: Union[str, None]) -> None:
+        frequency = self.settings["high_res_clock_frequency"]
+        if not frequency or not timing["transmit"]:
+            return
+
+        camera = (timing["camera_data_received"] - timing["camera_mid_exposure"]) / frequency
+        motive = (timing["transmit"] - timing["camera_data_received"]) / frequency
+
+        offset = received - timing["transmit"] / frequency
+        if self.clock_offset is None or offset < self.clock_offset:
+            self.clock_offset = offset
+        network = offset - self.clock_offset
+
+        latencies = (
+            ("camera", camera),
+            ("motive", motive),
+            ("network", network),
+            ("camera_to_receive", camera + motive + network),
+        )
+        for stage, latency in latencies:
+            self.session_stats.record_latency(stage, latency)
+            if segment is not None:
+                self.segment_stats.record_latency(stage, latency)
+
+    def __resolve_request(self, message_id: int, result: Any) -> None:
+        """Complete the oldest pending request expecting `message_id`; exceptions fail it."""
+        with self.request_lock:
+            for pending in self.pending_requests:
+                expected, future = pending
+                if message_id in expected:
+                    self.pending_requests.remove(pending)
+                    break
+            else:
+                return
+
+        # a cancelled future's caller gave up on it, but its reply is still consumed here
+        if future.set_running_or_notify_cancel():
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
     def __handle_response_message(
         self, bytestream: bytes, packet_size: int, message_id: int
     ) -> int:
@@ -193,21 +543,24 @@ class NatNetClient:
                     f"Command response: {command_response} - {[bytestream[offset+i] for i in range(4)]}"
                 )
                 offset += 4
+                self.__resolve_request(message_id, command_response)
             else:
                 message, _, _ = bytes(bytestream[offset:]).partition(b"\0")
                 if message.decode("utf-8").startswith("Bitstream"):
-                    nn_version = self.__unpack_bitstream_info(
-                        bytestream[offset:], packet_size
-                    )
+                    nn_version = self.__unpack_bitstream_info(message)
                     # Update the server version
                     self.settings["nat_net_stream_version_server"] = [
                         int(v) for v in nn_version
                     ] + [0] * (4 - len(nn_version))
                 trace(f"Command response: {message.decode('utf-8')}")
                 offset += len(message) + 1
+                self.__resolve_request(message_id, message.decode("utf-8"))
         elif message_id == self.NAT_UNRECOGNIZED_REQUEST:
             trace(f"Message ID:{message_id:.1f} (NAT_UNRECOGNIZED_REQUEST)")
             trace(f"Packet Size: {packet_size}")
+            self.__resolve_request(
+                message_id, RuntimeError("Server did not recognize the request.")
+            )
         elif message_id == self.NAT_MESSAGESTRING:
             trace(
                 f"Message ID:{message_id:.1f} (NAT_MESSAGESTRING), Packet Size: {packet_size}"
@@ -312,6 +665,12 @@ class NatNetClient:
             "BBBB", bytestream[offset + 260 : offset + 264]
         )
 
+        # Clock frequency of the frame suffix stamps, sent by NatNet 3.0+ servers
+        if len(bytestream) >= offset + 272:
+            (self.settings["high_res_clock_frequency"],) = struct.unpack_from(
+                "<Q", bytestream, offset + 264
+            )
+
         if self.settings["nat_net_requested_version"][:2] == [0, 0]:
             print(
                 f"Resetting requested version to {self.settings['nat_net_stream_version_server']} from {self.settings['nat_net_requested_version']}"
@@ -328,6 +687,15 @@ class NatNetClient:
         trace_mf(f"Sending Application Name: {self.settings['application_name']}")
         trace_mf(f"NatNetVersion: {self.settings['nat_net_stream_version_server']}")
         trace_mf(f"ServerVersion: {self.settings['server_version']}")
+        self.__resolve_request(
+            self.NAT_SERVERINFO,
+            {
+                "application_name": self.settings["application_name"],
+                "server_version": list(self.settings["server_version"]),
+                "nat_net_version": list(self.settings["nat_net_stream_version_server"]),
+                "high_res_clock_frequency": self.settings["high_res_clock_frequency"],
+            },
+        )
         return offset + 264
 
     # For local use; updates server bitstream version
@@ -340,25 +708,71 @@ class NatNetClient:
                 nn_version = messageList[1].split(".")
         return nn_version
 
+    def __receive_buffers(self) -> List[bytearray]:
+        # 64k buffer size, one per datagram drained in a wakeup
+        return [bytearray(64 * 1024) for _ in range(self.settings["recv_batch"])]
+
+    def __receive_batch(
+        self, in_socket: socket.socket, buffers: List[bytearray], timeout: float = 2.0
+    ) -> List[Tuple[bytearray, int, int]]:
+        """
+        Wait for the socket to become readable, then drain the datagrams
+        already queued (up to one per buffer) with recv_into, so no
+        per-packet bytes objects are allocated.
+
+        Returns:
+            list: (buffer, byte count, receive time in ns) per datagram
+
+        Raises:
+            socket.timeout: If nothing arrives within `timeout` seconds
+        """
+        try:
+            readable, _, _ = select.select([in_socket], [], [], timeout)
+        except ValueError as e:
+            # the socket was closed (fileno -1) by shutdown()
+            raise OSError(str(e))
+        if not readable:
+            raise socket.timeout("timed out")
+
+        batch = []
+        for buffer in buffers:
+            try:
+                n_bytes = in_socket.recv_into(buffer)
+            except (BlockingIOError, InterruptedError):
+                break
+            batch.append((buffer, n_bytes, time.perf_counter_ns()))
+
+        return batch
+
     def __command_thread_function(
         self, in_socket: socket.socket, stop: Callable, gprint_level: int
     ) -> int:
         message_id_dict = {}
-        if not self.settings["use_multicast"]:
-            in_socket.settimeout(2.0)
+        # __receive_batch waits in select() with a timeout to allow for keep alive
+        # messages, then drains without blocking
+        in_socket.setblocking(False)
 
-        # 64k buffer size
-        recv_buffer_size = 64 * 1024
+        buffers = self.__receive_buffers()
         while not stop():
             # Block for input
             try:
-                bytestream, _ = in_socket.recvfrom(recv_buffer_size)
+                batch = self.__receive_batch(in_socket, buffers)
             except (
                 socket.error,
                 socket.herror,
                 socket.gaierror,
                 socket.timeout,
             ) as e:
+                # the connection outlives quiet periods between trials
+                if isinstance(e, socket.timeout) and not stop():
+                    if not self.settings["use_multicast"]:
+                        self.send_keep_alive(
+                            in_socket,
+                            self.settings["server_ip"],
+                            self.settings["command_port"],
+                        )
+                    continue
+
                 if (
                     stop()
                     or isinstance(e, socket.timeout)
@@ -369,20 +783,19 @@ class NatNetClient:
                     print("shutting down")
                 return 1
 
-            if bytestream:
-                # peek ahead at message_id
-                message_id = get_message_id(bytestream)
-                tmp_str = f"mi_{message_id:.1f}"
-                message_id_dict[tmp_str] = message_id_dict.get(tmp_str, 0) + 1
+            for buffer, n_bytes, received_ns in batch:
+                if n_bytes:
+                    # peek ahead at message_id
+                    message_id = get_message_id(buffer)
+                    message_id_dict[message_id] = message_id_dict.get(message_id, 0) + 1
 
-                print_level = gprint_level()
-                if message_id == self.NAT_FRAMEOFDATA and print_level > 0:
-                    print_level = (
-                        1 if message_id_dict[tmp_str] % print_level == 0 else 0
-                    )
+                    print_level = gprint_level()
+                    if message_id == self.NAT_FRAMEOFDATA and print_level > 0:
+                        print_level = (
+                            1 if message_id_dict[message_id] % print_level == 0 else 0
+                        )
 
-                message_id = self.__process_message(bytestream)
-                bytestream = bytearray()
+                    message_id = self.process_datagram(buffer, received_ns, n_bytes)
 
             if not self.settings["use_multicast"] and not stop():
                 self.send_keep_alive(
@@ -397,51 +810,62 @@ class NatNetClient:
         self, in_socket: socket.socket, stop: Callable, gprint_level: Callable
     ) -> int:
         message_id_dict = {}
-        # 64k buffer size
-        recv_buffer_size = 64 * 1024
+        # closing the socket does not wake a blocked wait on Linux,
+        # so __receive_batch times out to poll stop() instead
+        in_socket.setblocking(False)
+        buffers = self.__receive_buffers()
 
         while not stop():
             # Block for input
             try:
-                bytestream, _ = in_socket.recvfrom(recv_buffer_size)
+                batch = self.__receive_batch(in_socket, buffers)
             except (
                 socket.error,
                 socket.herror,
                 socket.gaierror,
                 socket.timeout,
             ) as e:
-                if not stop() or isinstance(e, socket.timeout):
+                if isinstance(e, socket.timeout) and not stop():
+                    continue
+
+                if not stop():
                     print(f"ERROR: data socket access error occurred:\n{e}")
                 return 1
 
-            if bytestream:
-                # peek ahead at message_id
-                message_id = get_message_id(bytestream)
-                tmp_str = f"mi_{message_id:.1f}"
-                message_id_dict[tmp_str] = message_id_dict.get(tmp_str, 0) + 1
+            for buffer, n_bytes, received_ns in batch:
+                if n_bytes:
+                    # peek ahead at message_id
+                    message_id = get_message_id(buffer)
+                    message_id_dict[message_id] = message_id_dict.get(message_id, 0) + 1
 
-                print_level = gprint_level()
-                if message_id == self.NAT_FRAMEOFDATA and print_level > 0:
-                    print_level = (
-                        1 if message_id_dict[tmp_str] % print_level == 0 else 0
-                    )
+                    print_level = gprint_level()
+                    if message_id == self.NAT_FRAMEOFDATA and print_level > 0:
+                        print_level = (
+                            1 if message_id_dict[message_id] % print_level == 0 else 0
+                        )
 
-                message_id = self.__process_message(bytestream)
-                bytestream = bytearray()
+                    message_id = self.process_datagram(buffer, received_ns, n_bytes)
 
         return 0
 
-    def __process_message(self, bytestream: bytes) -> int:
+    def __process_message(
+        self, bytestream: bytes, received: float = 0.0, length: Union[int, None] = None
+    ) -> int:
         message_id = get_message_id(bytestream)
         packet_size = int.from_bytes(bytestream[2:4], byteorder="little")
 
+        # everything but frames is rare; trim those to the datagram once,
+        # while frames are decoded in place from the receive buffer
+        if message_id != self.NAT_FRAMEOFDATA and length not in (None, len(bytestream)):
+            bytestream = bytes(memoryview(bytestream)[:length])
+
         # skip the 4 bytes for message ID and packet_size
         offset = 4
         if message_id == self.NAT_FRAMEOFDATA:
-            offset += self.__unpack_data(bytestream[offset:])
+            offset += self.__unpack_data(bytestream, offset, received, end=length)
 
         elif message_id == self.NAT_MODELDEF:
-            offset += self.__unpack_descriptions(bytestream[offset:])
+            offset = self.__unpack_descriptions(bytestream, offset)
 
         elif message_id == self.NAT_SERVERINFO:
             trace(
@@ -468,6 +892,37 @@ class NatNetClient:
     # Public Utility Functions  #
     # # # # # # # # # # # # # # #
 
+    def process_datagram(
+        self,
+        bytestream: Union[bytes, bytearray],
+        received_ns: Union[int, None] = None,
+        length: Union[int, None] = None,
+    ) -> int:
+        """
+        Handle one datagram from either channel: capture it, decode it and notify listeners.
+
+        The receive threads call this; other transports (e.g. AsyncNatNetClient)
+        can feed datagrams they received themselves.
+
+        Args:
+            bytestream (bytes): The datagram, or a receive buffer that starts with it.
+            received_ns (int, optional): Receive time from time.perf_counter_ns(). Defaults to now.
+            length (int, optional): Datagram size within the buffer. Defaults to all of it.
+
+        Returns:
+            int: The message id
+        """
+        if received_ns is None:
+            received_ns = time.perf_counter_ns()
+        if length is None:
+            length = len(bytestream)
+
+        capture = self.capture
+        if capture is not None:
+            capture.write(received_ns, memoryview(bytestream)[:length])
+
+        return self.__process_message(bytestream, received_ns / 1e9, length)
+
     def set_client_address(self, local_ip_address: str) -> None:
         if not self.settings["is_locked"]:
             self.settings["local_ip"] = local_ip_address
@@ -498,26 +953,27 @@ class NatNetClient:
             sz_command = (
                 f"Bitstream {NatNetRequestedVersion[0]}.{NatNetRequestedVersion[1]}"
             )
-            if self.send_command(sz_command) >= 0:
-                self.settings["nat_net_requested_version"] = NatNetRequestedVersion
-                print("changing bitstream MAIN")
-
-                # force frame send and play reset
-                self.send_command("TimelinePlay")
-                time.sleep(0.1)
-                self.send_commands(
-                    [
-                        "TimelinePlay",
-                        "TimelineStop",
-                        "SetPlaybackCurrentFrame,0",
-                        "TimelineStop",
-                    ],
-                    False,
-                )
-                time.sleep(2)
-                return 0
-            else:
-                print("Bitstream change request failed")
+            try:
+                self.command(sz_command)
+            except (RuntimeError, TimeoutError) as e:
+                print(f"Bitstream change request failed: {e!r}")
+                return -1
+
+            self.settings["nat_net_requested_version"] = NatNetRequestedVersion
+            print("changing bitstream MAIN")
+
+            # force frame send and play reset; each command waits for the server's reply
+            self.send_commands(
+                [
+                    "TimelinePlay",
+                    "TimelinePlay",
+                    "TimelineStop",
+                    "SetPlaybackCurrentFrame,0",
+                    "TimelineStop",
+                ],
+                False,
+            )
+            return 0
         return -1
 
     def get_application_name(self) -> str:
@@ -535,6 +991,127 @@ class NatNetClient:
     def get_command_port(self) -> int:
         return self.settings["command_port"]
 
+    def subscribe(
+        self,
+        marker_sets: Union[List[str], None] = None,
+        blocks: Union[List[str], None] = None,
+    ) -> None:
+        """
+        Limit frame decoding to the given marker set labels and data blocks
+        (see MotiveStreamDecoder.FRAME_BLOCKS); None subscribes to all.
+        Everything else is skipped by its byte length without being decoded.
+        """
+        if blocks is None:
+            blocks = FRAME_BLOCKS
+
+        unknown = set(blocks) - set(FRAME_BLOCKS)
+        if unknown:
+            raise ValueError(f"Unknown data block(s): {', '.join(sorted(unknown))}")
+
+        labels = None if marker_sets is None else frozenset(marker_sets)
+        # swapped in one assignment so the data thread never sees half an update
+        self.subscriptions = (labels, frozenset(blocks))
+
+    # Recording Segment Functions #
+    # # # # # # # # # # # # # # # #
+
+    def begin_segment(self, name: str) -> None:
+        """Tag all subsequently received frames as belonging to segment `name`."""
+        if self.segment is not None:
+            self.end_segment()
+
+        self.segment_stats = StreamStats()
+        with self.frame_counted:
+            self.frame_counts = {}
+        self.segment = name
+
+    def end_segment(self) -> None:
+        """
+        Stop tagging frames; listeners receive them with a segment of None.
+        Returns once listeners have been handed every frame of the segment.
+        """
+        segment, self.segment = self.segment, None
+        if self.dispatcher is not None:
+            self.dispatcher.join()
+
+        if segment is not None and self.settings["segment_stats"]:
+            self.segment_stats.write(f"{segment}.stats.json")
+
+    def stats(self, segment: bool = False) -> dict:
+        """
+        Snapshot of frame continuity and timing statistics: frames received,
+        dropped frames and gaps by frame_number, inter-arrival interval summary
+        and histogram, decode time percentiles, and latency percentiles for each
+        stage from camera exposure to listener (see StreamStats.LATENCY_STAGES).
+
+        Args:
+            segment (bool, optional): Current (or last) segment only, rather than the session.
+        """
+        return (self.segment_stats if segment else self.session_stats).snapshot()
+
+    def dispatch_stats(self) -> dict[str, int]:
+        """Queued, dispatched, dropped and pending listener call counts."""
+        if self.dispatcher is None:
+            return {}
+        return self.dispatcher.stats()
+
+    def get_segment(self) -> Union[str, None]:
+        return self.segment
+
+    def frame_count(self, marker_set: str) -> int:
+        """Frames with markers received for `marker_set` since the segment began."""
+        with self.frame_counted:
+            return self.frame_counts.get(marker_set, 0)
+
+    def frames_ready(self, marker_set: str, n_frames: int) -> bool:
+        """Non-blocking check that at least `n_frames` frames of `marker_set` have arrived."""
+        return self.frame_count(marker_set) >= n_frames
+
+    def wait_for_frames(self, marker_set: str, n_frames: int, timeout: float = 1.0) -> int:
+        """
+        Block until `n_frames` frames with markers for `marker_set` have been
+        received since the segment (or session) began.
+
+        Returns:
+            int: Frames received so far
+
+        Raises:
+            ValueError: If the marker set is excluded by subscribe()
+            TimeoutError: If the frames do not arrive within `timeout` seconds
+        """
+        labels, blocks = self.subscriptions
+        if "marker_sets" not in blocks or (labels is not None and marker_set not in labels):
+            raise ValueError(f"Not subscribed to marker set '{marker_set}'.")
+
+        with self.frame_counted:
+            ready = self.frame_counted.wait_for(
+                lambda: self.frame_counts.get(marker_set, 0) >= n_frames, timeout
+            )
+            count = self.frame_counts.get(marker_set, 0)
+
+        if not ready:
+            received = self.session_stats.snapshot()["frames"]
+            raise TimeoutError(
+                f"Received {count} of {n_frames} frames for marker set '{marker_set}' "
+                f"within {timeout}s ({received} frames of any kind this session). "
+                "Check that Motive is streaming and the marker set is tracked."
+            )
+
+        return count
+
+    # Capture Functions #
+    # # # # # # # # # # #
+
+    def start_capture(self, path: str) -> None:
+        """Write every datagram received from here on to a capture file (see MotiveCapture)."""
+        self.stop_capture()
+        self.capture = CaptureWriter(path)
+
+    def stop_capture(self) -> None:
+        capture, self.capture = self.capture, None
+        if capture is not None:
+            capture.close()
+
     # Server Communication Functions  #
     # # # # # # # # # # # # # # # # # #
 
@@ -593,12 +1170,106 @@ class NatNetClient:
 
         # return self.send_request(self.data_socket,    self.NAT_REQUEST, command_str,  (self.server_ip_address, self.command_port) )
 
-    def send_commands(self, tmpCommands: list[str], print_results: bool = True) -> None:
+    def request(self, command: int, command_str: str = "") -> Future:
+        """
+        Send a request over the command channel without waiting for the reply.
+
+        Returns:
+            Future: Resolves with the reply: the server info dict for NAT_CONNECT, the
+            descriptions dict for NAT_REQUEST_MODELDEF, the response code or string
+            for NAT_REQUEST. Fails with RuntimeError if the
+            server does not recognize the request or it could not be sent. Cancel it
+            to stop waiting.
+        """
+        if command == self.NAT_CONNECT:
+            expected = (self.NAT_SERVERINFO,)
+        elif command == self.NAT_REQUEST_MODELDEF:
+            expected = (self.NAT_MODELDEF, self.NAT_UNRECOGNIZED_REQUEST)
+        elif command == self.NAT_REQUEST:
+            expected = (self.NAT_RESPONSE, self.NAT_UNRECOGNIZED_REQUEST)
+        else:
+            raise ValueError(f"No reply is tracked for message id {command}.")
+
+        if self.command_socket is None:
+            raise RuntimeError("Command channel is not open; call startup() first.")
+
+        future = Future()
+        pending = (expected, future)
+        # registered before sending, so the reply cannot beat it here
+        with self.request_lock:
+            self.pending_requests.append(pending)
+
+        try:
+            sent = self.send_request(
+                self.command_socket,
+                command,
+                command_str,
+                (self.settings["server_ip"], self.settings["command_port"]),
+            )
+        except socket.error as e:
+            sent = -1
+            error = e
+        else:
+            error = None
+
+        if sent == -1:
+            with self.request_lock:
+                if pending in self.pending_requests:
+                    self.pending_requests.remove(pending)
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError(f"Could not send request: {error!r}"))
+
+        return future
+
+    def command(self, command_str: str, timeout: float = 1.0) -> Union[int, str]:
+        """
+        Send a NAT_REQUEST command and block until the server replies.
+
+        Must not be called from a listener running on the command thread,
+        which is the thread that delivers the reply.
+
+        Returns:
+            Union[int, str]: The server's response code or message
 
+        Raises:
+            RuntimeError: If the server does not recognize the command
+            TimeoutError: If no reply arrives within `timeout` seconds
+        """
+        future = self.request(self.NAT_REQUEST, command_str)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            self.cancel_request(future)
+            raise TimeoutError(f"No reply to command '{command_str}' within {timeout}s.")
+
+    def cancel_request(self, future: Union[Future, None] = None) -> None:
+        """
+        Stop waiting on a request (every pending request if None). Its reply is
+        taken to be lost, so it is no longer matched against incoming replies.
+        """
+        with self.request_lock:
+            if future is None:
+                cancelled = [pending[1] for pending in self.pending_requests]
+                self.pending_requests.clear()
+            else:
+                cancelled = [future]
+                for pending in self.pending_requests:
+                    if pending[1] is future:
+                        self.pending_requests.remove(pending)
+                        break
+
+        for pending_future in cancelled:
+            pending_future.cancel()
+
+    def send_commands(self, tmpCommands: list[str], print_results: bool = True) -> None:
+        """Send each command in turn, waiting for each reply before the next."""
         for sz_command in tmpCommands:
-            return_code = self.send_command(sz_command)
+            try:
+                result = self.command(sz_command)
+            except (RuntimeError, TimeoutError) as e:
+                result = repr(e)
             if print_results:
-                print("Command: %s - return_code: %d" % (sz_command, return_code))
+                print(f"Command: {sz_command} - result: {result}")
 
     def send_keep_alive(
         self,
@@ -610,14 +1281,39 @@ class NatNetClient:
             in_socket, self.NAT_KEEPALIVE, "", (server_ip_address, server_port)
         )
 
-    def refresh_configuration(self) -> None:
-        # query for application configuration
-        # print("Request current configuration")
-        sz_command = "Bitstream"
-        return_code = self.send_command(sz_command)
-        time.sleep(0.5)
+    def refresh_configuration(self, timeout: float = 1.0) -> Union[int, str]:
+        """Query the server's bitstream version; settings are updated once it replies."""
+        return self.command("Bitstream", timeout)
+
+    def refresh_descriptions(self, timeout: float = 1.0) -> dict:
+        """
+        Request the server's model descriptions and block until they arrive.
+
+        The marker set layout is replaced, and the cache (if enabled) updated,
+        before this returns. Frames request descriptions on their own whenever
+        the streamed asset set changes.
+
+        Returns:
+            dict: marker_sets and rigid_bodies descriptions (see ModelDescriptions)
+
+        Raises:
+            TimeoutError: If no reply arrives within `timeout` seconds
+        """
+        future = self.request(self.NAT_REQUEST_MODELDEF)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            self.cancel_request(future)
+            raise TimeoutError(f"No model descriptions received within {timeout}s.")
+
+    def running(self) -> bool:
+        return self.data_thread is not None and self.data_thread.is_alive()
 
     def startup(self) -> bool:
+        # Connections are session-lifetime; segment frames with begin_segment()
+        if self.running():
+            return True
+
         # Create the data socket
         self.data_socket = self.__create_data_socket(self.settings["data_port"])
         if self.data_socket is None:
@@ -631,6 +1327,14 @@ class NatNetClient:
             return False
         self.settings["is_locked"] = True
 
+        if self.settings["dispatch_queue_size"] > 0:
+            self.dispatcher = FrameDispatcher(
+                self.settings["dispatch_queue_size"],
+                self.settings["dispatch_policy"],
+                self.settings["dispatch_workers"],
+            )
+            self.dispatcher.start()
+
         self.stop_threads = False
         # Create a separate thread for receiving data packets
         self.data_thread = Thread(
@@ -655,33 +1359,37 @@ class NatNetClient:
         self.command_thread.start()
 
         # Required for setup
-        # Get NatNet and server versions
-        self.send_request(
-            self.command_socket,
-            self.NAT_CONNECT,
-            "",
-            (self.settings["server_ip"], self.settings["command_port"]),
-        )
+        # Get NatNet and server versions; self.server_info resolves once the server answers
+        self.server_info = self.request(self.NAT_CONNECT)
 
-        ##Example Commands
-        ## Get NatNet and server versions
-        self.send_request(
-            self.command_socket,
-            self.NAT_REQUEST_FRAMEOFDATA,
-            "",
-            (self.settings["server_ip"], self.settings["command_port"]),
-        )
-        ## Request the model definitions
-        # self.send_request(self.command_socket, self.NAT_REQUEST_MODELDEF, "",  (self.settings['server_ip'], self.settings['command_port']) )
+        # No NAT_REQUEST_FRAMEOFDATA here: its reply would be decoded on the command
+        # thread, a second writer to the single-writer frame buffers.
+        # Model definitions are requested (or loaded from the description cache)
+        # once the first frame shows which assets are streaming
         return True
 
     def shutdown(self) -> None:
         print("shutdown called")
         self.stop_threads = True
+        self.end_segment()
+        self.stop_capture()
         # closing sockets causes blocking recvfrom to throw
         # an exception and break the loop
-        self.command_socket.close()
-        self.data_socket.close()
+        for sock in (self.command_socket, self.data_socket):
+            if sock is not None:
+                sock.close()
         # attempt to join the threads back.
-        self.command_thread.join()
-        self.data_thread.join()
+        for thread in (self.command_thread, self.data_thread):
+            if thread is not None:
+                thread.join()
+
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+
+        # nothing will answer requests still in flight
+        self.cancel_request()
+
+        self.command_socket = self.data_socket = None
+        self.command_thread = self.data_thread = None
+        self.dispatcher = None
+        self.settings["is_locked"] = False
@@ -0,0 +1,189 @@
+"""
+Extract kinematic features from every trial recording under OptiData.
+
+Walks OptiData/<p_id>/<testing|practice>/<block>_<condition>_<bias>_bias/
+trial_<n>_<location>_target[.bin], parses the condition metadata from the
+path, runs the trials through Kinematics in a process pool, and appends one
+row per trial to a single CSV table. Trials already in the table are
+skipped, so an interrupted run picks up where it left off:
+
+    python reprocess.py ../../../OptiData --out kinematics.csv --workers 8
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from csv import DictReader, DictWriter
+from typing import List
+
+from Kinematics import trial_kinematics
+from OptiTracker import OptiTracker
+from TrialFile import TRIAL_EXT, read_header
+
+PHASES = ("testing", "practice")
+BLOCK_PATTERN = re.compile(r"^(?P<block>\d+)_(?P<condition>[a-z]+)_(?P<bias>[a-z]+)_bias$")
+TRIAL_PATTERN = re.compile(
+    r"^trial_(?P<trial>\d+)_(?P<target>[a-z]+)_target(?P<ext>" + re.escape(TRIAL_EXT) + ")?$"
+)
+
+METADATA = ("path", "participant", "phase", "block", "condition", "bias", "trial", "target", "likely")
+FEATURES = (
+    "first_frame",
+    "n_frames",
+    "duration",
+    "path_length",
+    "peak_speed",
+    "peak_speed_time",
+    "peak_acceleration",
+    "peak_acceleration_time",
+    "peak_jerk",
+    "peak_jerk_time",
+)
+
+
+def find_trials(root: str) -> List[dict]:
+    """
+    List every trial recording under an OptiData directory.
+
+    Where a trial has both a binary recording and a converted CSV copy,
+    only the binary one is listed.
+
+    Returns:
+        list: Metadata dicts (see METADATA), sorted by path
+    """
+    trials = {}
+    for participant in sorted(os.listdir(root)):
+        for phase in PHASES:
+            phase_dir = os.path.join(root, participant, phase)
+            if not os.path.isdir(phase_dir):
+                continue
+
+            for block_name in sorted(os.listdir(phase_dir)):
+                block = BLOCK_PATTERN.match(block_name)
+                if block is None:
+                    continue
+
+                block_dir = os.path.join(phase_dir, block_name)
+                for fname in sorted(os.listdir(block_dir)):
+                    trial = TRIAL_PATTERN.match(fname)
+                    if trial is None:
+                        continue
+
+                    key = (block_dir, trial["trial"], trial["target"])
+                    if key in trials and not trial["ext"]:
+                        continue
+
+                    trials[key] = {
+                        "path": os.path.join(block_dir, fname),
+                        "participant": participant,
+                        "phase": phase,
+                        "block": int(block["block"]),
+                        "condition": block["condition"],
+                        "bias": block["bias"],
+                        "trial": int(trial["trial"]),
+                        "target": trial["target"],
+                        "likely": trial["target"] == block["bias"],
+                    }
+
+    return sorted(trials.values(), key=lambda trial: trial["path"])
+
+
+def trial_features(trial: dict, sample_rate: float = 120, cutoff: float = 10) -> dict:
+    """
+    Compute the kinematic summary row for one trial.
+
+    Binary recordings carry their own sample rate; `sample_rate` is used for CSV files.
+    """
+    path = trial["path"]
+    marker_count = 0
+    if path.endswith(TRIAL_EXT):
+        header = read_header(path)
+        sample_rate = header["sample_rate"]
+        marker_count = header["marker_count"]
+
+    tracker = OptiTracker(marker_count=marker_count, sample_rate=sample_rate, data_dir=path)
+    profile = trial_kinematics(tracker, cutoff=cutoff)
+
+    row = dict(trial)
+    row["first_frame"] = int(profile["frame_numbers"][0])
+    row["n_frames"] = len(profile["frame_numbers"])
+    row["duration"] = (row["n_frames"] - 1) / sample_rate
+    for feature in FEATURES[3:]:
+        row[feature] = profile[feature]
+
+    return row
+
+
+def processed_paths(out: str) -> set:
+    """Get the trial paths already present in an output table."""
+    if not os.path.exists(out):
+        return set()
+
+    with open(out, newline="") as file:
+        return {row["path"] for row in DictReader(file)}
+
+
+def reprocess(root: str, out: str, workers: int, sample_rate: float, cutoff: float) -> int:
+    """
+    Process every trial under `root` not already in `out`, appending rows as they finish.
+
+    Returns:
+        int: Number of trials that failed
+    """
+    done = processed_paths(out)
+    trials = [trial for trial in find_trials(root) if trial["path"] not in done]
+    print(f"{len(trials)} trial(s) to process, {len(done)} already in {out}", file=sys.stderr)
+    if not trials:
+        return 0
+
+    failed = 0
+    start = time.perf_counter()
+    new_file = not os.path.exists(out)
+
+    with open(out, "a", newline="") as file, ProcessPoolExecutor(workers) as pool:
+        writer = DictWriter(file, fieldnames=METADATA + FEATURES)
+        if new_file:
+            writer.writeheader()
+
+        futures = {
+            pool.submit(trial_features, trial, sample_rate, cutoff): trial for trial in trials
+        }
+        for n, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]["path"]
+            try:
+                writer.writerow(future.result())
+                # rows already written are skipped on the next run
+                file.flush()
+                status = "ok"
+            except Exception as e:
+                failed += 1
+                status = f"FAILED: {e!r}"
+
+            elapsed = time.perf_counter() - start
+            print(f"[{n}/{len(trials)} {elapsed:.1f}s] {path} {status}", file=sys.stderr)
+
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root", nargs="?", default="OptiData", help="OptiData directory")
+    parser.add_argument("--out", default="kinematics.csv", help="consolidated output table")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(), help="worker processes (default: all cores)"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=120, help="sample rate in Hz for CSV trial files"
+    )
+    parser.add_argument("--cutoff", type=float, default=10, help="low-pass cutoff in Hz")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        raise SystemExit(f"OptiData directory not found at:\n{args.root}")
+
+    failed = reprocess(args.root, args.out, args.workers, args.rate, args.cutoff)
+    if failed:
+        raise SystemExit(f"{failed} trial(s) failed; rerun to retry them.")
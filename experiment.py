@@ -5,7 +5,6 @@ __author__ = "Brett Feltmate"
 from random import shuffle, choice
 from rich.console import Console
 import os
-from csv import DictWriter
 
 from math import floor
 
@@ -31,6 +30,7 @@ from klibs.KLTime import CountDown
 from klibs.KLExceptions import TrialException
 
 from natnetclient_rough import NatNetClient  # type: ignore[import]
+from TrialRecorder import TrialRecorder  # type: ignore[import]
 
 LIKELY = "likely"
 UNLIKELY = "unlikely"
@@ -51,8 +51,29 @@ class sequential_pointing(klibs.Experiment):
         if P.development_mode:
             self.console = Console()
 
-        self.nnc = NatNetClient()
+        # buffers mocap frames and writes them in the background, one binary file per
+        # trial; each file's header takes its marker count from the first hand frame
+        self.recorder = TrialRecorder(sample_rate=120)
+
+        # per-trial frame drop / jitter stats are written next to each recording;
+        # model descriptions are reused across sessions until Motive's assets change;
+        # a single dispatch worker keeps frames reaching the recorder in order, and a
+        # full dispatch queue blocks rather than dropping frames from the recording
+        self.nnc = NatNetClient(
+            {
+                "segment_stats": True,
+                "description_cache": os.path.join("ExpAssets", "model_descriptions.json"),
+                "dispatch_workers": 1,
+                "dispatch_policy": "block",
+            }
+        )
         self.nnc.markers_listener = self.marker_set_listener
+        # only the hand is recorded; skip decoding everything else
+        self.nnc.subscribe(marker_sets=["hand"], blocks=["marker_sets"])
+
+        # connect once per session; trials are recorded as segments of the stream
+        if not self.nnc.startup():
+            raise RuntimeError("Could not connect to the NatNet server.")
 
         placeholder_size = P.ppi
 
@@ -180,14 +201,23 @@ class sequential_pointing(klibs.Experiment):
             if mouse_clicked(within=self.bs.boundaries["start"], queue=q):
                 break
 
-        # spin up mocap listener
-        self.nnc.startup()
-
-        # provide opti a 10 frame head start
-        nnc_lead = CountDown((1 / 120) * 10)
-        while nnc_lead.counting():
-            q = pump(True)
-            ui_request(queue=q)
+        # route incoming mocap frames to this trial's recording
+        self.recorder.begin(self.opti_dir + self.opti_trial_fname)
+        self.nnc.begin_segment(self.opti_dir + self.opti_trial_fname)
+
+        # start once the recording holds 10 hand frames, rather than after a fixed 10-frame guess
+        try:
+            self.nnc.wait_for_frames("hand", 10, timeout=2.0)
+        except TimeoutError as e:
+            # tracking dropped out; discard this attempt so the trial is recycled
+            path = self.recorder.path
+            self.nnc.end_segment()
+            self.recorder.end()
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+            if P.development_mode:
+                print(e)
+            raise TrialException("No hand frames received before trial start")
 
         # For "immediate" blocks, present target at trial start
         self.present_stimuli(target_visible=self.block_condition == "immediate")
@@ -361,12 +391,14 @@ class sequential_pointing(klibs.Experiment):
         return trial_out
 
     def trial_clean_up(self):
-        # self.nnc.shutdown()
+        self.nnc.end_segment()
+        # final flush of this trial's recording
+        self.recorder.end()
         clear()
 
     def clean_up(self):
-        # self.nnc.shutdown()
-        pass
+        self.nnc.shutdown()
+        self.recorder.close()
 
     def present_stimuli(self, pre_trial: bool = False, target_visible: bool = False):
         fill()
@@ -480,30 +512,22 @@ class sequential_pointing(klibs.Experiment):
                 return clicks[0], clicked
 
     def marker_set_listener(self, marker_set: dict) -> None:
-        """Write marker set data to CSV file.
+        """Buffer marker set data for the trial's binary recording.
+
+        Runs on the NatNet client's FrameDispatcher worker; with the "block"
+        policy, slow work here stalls the receive thread once the queue is full,
+        so TrialRecorder writes in the background (see TrialRecorder.to_csv for
+        CSV output). Frames are recorded in call order, which is frame order
+        only with one dispatch worker.
 
         Args:
             marker_set (dict): Dictionary containing marker data to be written.
-                Expected format: {'markers': [{'key1': val1, ...}, ...]}
+                Expected format: {'label': str, 'frame_number': int, 'segment': str, 'markers': (n, 3) array}
         """
-        pass
+
+        # frames arriving between trials belong to no segment
+        if marker_set.get("segment") is None:
+            return
 
         if marker_set.get("label") == "hand":
-            # Append data to trial-specific CSV file
-            fname = self.opti_dir + self.opti_trial_fname
-
-            # Timestamp marker data with relative trial time
-            header = list(marker_set["markers"][0].keys())
-
-            # if file doesn't exist, create it and write header
-            if not os.path.exists(fname):
-                with open(fname, "w", newline="") as file:
-                    writer = DictWriter(file, fieldnames=header)
-                    writer.writeheader()
-
-            # append marker data to file
-            with open(fname, "a", newline="") as file:
-                writer = DictWriter(file, fieldnames=header)
-                for marker in marker_set.get("markers", None):
-                    if marker is not None:
-                        writer.writerow(marker)
+            self.recorder.append(marker_set["frame_number"], marker_set["markers"])
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# experiment modules are imported flat, as klibs does from ExpAssets/Resources/code
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ExpAssets", "Resources", "code")
+)
@@ -0,0 +1,85 @@
+from threading import Thread
+
+import numpy as np
+import pytest
+
+from FrameRingBuffer import FrameRingBuffer, _attach_shared_memory
+
+
+@pytest.fixture
+def ring():
+    buffer = FrameRingBuffer(capacity=4, max_markers=2)
+    yield buffer
+    buffer.close()
+
+
+def markers_for(frame_number: int) -> np.ndarray:
+    return np.full((2, 3), frame_number, dtype=np.float32)
+
+
+def test_snapshot_excludes_unpublished_write(ring):
+    for frame_number in range(5):
+        ring.write(frame_number, 0.0, markers_for(frame_number))
+
+    # frame 5 fully written into its slots, but the write count not yet published
+    ring.write(5, 0.0, markers_for(5))
+    shm = _attach_shared_memory(ring.name)
+    header = np.ndarray((4,), dtype=np.int64, buffer=shm.buf)
+    header[0] = 5
+
+    frames = ring.snapshot()
+    del header
+    shm.close()
+
+    assert frames["frame_number"].tolist() == [2, 3, 4]
+    for frame_number, positions in zip(frames["frame_number"], frames["positions"]):
+        assert np.all(positions == frame_number)
+
+
+def test_snapshot_caps_at_capacity_minus_one(ring):
+    for frame_number in range(10):
+        ring.write(frame_number, 0.0, markers_for(frame_number))
+
+    assert len(ring.snapshot(num_frames=4)["frame_number"]) == 3
+    assert ring.snapshot(num_frames=2)["frame_number"].tolist() == [8, 9]
+    assert len(ring.snapshot()["count"]) == 3
+
+
+def test_snapshot_empty_and_partial(ring):
+    assert len(ring.snapshot()["frame_number"]) == 0
+
+    ring.write(0, 0.0, markers_for(0))
+    assert ring.snapshot()["frame_number"].tolist() == [0]
+
+
+def test_snapshot_needs_two_slots():
+    buffer = FrameRingBuffer(capacity=1, max_markers=1)
+    try:
+        with pytest.raises(ValueError):
+            buffer.snapshot()
+    finally:
+        buffer.close()
+
+
+def test_snapshot_rows_consistent_under_concurrent_writes():
+    buffer = FrameRingBuffer(capacity=8, max_markers=64)
+    stop = False
+
+    def writer():
+        frame_number = 0
+        while not stop:
+            buffer.write(frame_number, 0.0, np.full((64, 3), frame_number, dtype=np.float32))
+            frame_number += 1
+
+    thread = Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(2000):
+            frames = buffer.snapshot()
+            for frame_number, positions in zip(frames["frame_number"], frames["positions"]):
+                assert np.all(positions == frame_number)
+            assert np.all(np.diff(frames["frame_number"]) == 1)
+    finally:
+        stop = True
+        thread.join()
+        buffer.close()
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from Kinematics import kinematics, stack_trials
+from SyntheticMotive import minimum_jerk
+
+
+def reach(n_frames):
+    return minimum_jerk(np.zeros(3), np.array([300.0, 100.0, 0.0]), n_frames)
+
+
+def test_batched_trials_match_single_trials():
+    trials = [reach(60), reach(200), reach(60)[::-1]]
+    batch, lengths = stack_trials(trials)
+
+    batched = kinematics(batch, 120, lengths)
+    for i, trial in enumerate(trials):
+        single = kinematics(trial, 120)
+        n_frames = len(trial)
+
+        for name in ("speed", "acceleration", "jerk"):
+            assert np.allclose(batched[name][i, :n_frames], single[name])
+            assert np.isnan(batched[name][i, n_frames:]).all()
+            assert batched[f"peak_{name}"][i] == pytest.approx(single[f"peak_{name}"])
+            assert batched[f"peak_{name}_time"][i] == single[f"peak_{name}_time"]
+        assert batched["path_length"][i] == pytest.approx(single["path_length"])
+
+
+def test_path_length_of_a_straight_reach():
+    profile = kinematics(reach(120), 120, smooth=False)
+
+    assert profile["path_length"] == pytest.approx(np.hypot(300, 100))
+    assert profile["peak_speed_time"] == pytest.approx(0.5, abs=1 / 120)
+
+
+def test_rejects_trials_too_short_to_differentiate():
+    batch, lengths = stack_trials([reach(60), reach(1)])
+    with pytest.raises(ValueError):
+        kinematics(batch, 120, lengths)
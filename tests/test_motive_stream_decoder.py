@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from MotiveStreamDecoder import (
+    FRAME_BLOCKS,
+    LABELED_MARKER_DTYPE,
+    RIGID_BODY_DTYPE,
+    MotiveStreamDecoder,
+)
+from SyntheticMotive import build_frame
+
+HAND = np.arange(9, dtype=np.float32).reshape(3, 3) / 10
+TARGET = np.full((1, 3), 0.5, dtype=np.float32)
+
+
+def synthetic_frame(**blocks):
+    return build_frame(
+        42, [("hand", HAND), ("target", TARGET)], unlabeled=np.ones((2, 3)), **blocks
+    )
+
+
+def test_decodes_marker_sets():
+    parser = MotiveStreamDecoder(synthetic_frame())
+
+    assert parser.parse("frame_number") == 42
+
+    assert parser.parse("count") == 2
+    parser.parse("size")
+    for label, markers in [("hand", HAND), ("target", TARGET)]:
+        assert parser.parse("label") == label
+        assert np.array_equal(parser.parse_markers(parser.parse("count")), markers)
+
+    assert parser.parse("count") == 2
+    parser.parse("size")
+    assert np.array_equal(parser.parse_markers(2), np.ones((2, 3)))
+
+
+def test_decodes_rigid_bodies():
+    records = np.zeros(2, dtype=RIGID_BODY_DTYPE)
+    records["id"] = [1, 2]
+    records["pos"] = [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]]
+    records["rot"] = [[0, 0, 0, 1], [0, 1, 0, 0]]
+    records["error"] = [0.001, 0.002]
+    records["params"] = [1, 0]
+
+    parser = MotiveStreamDecoder(synthetic_frame(rigid_bodies=records))
+    parser.parse("frame_number")
+    # marker sets, legacy markers
+    parser.skip_blocks(2)
+
+    rigid_bodies = parser.parse_rigid_bodies()
+    assert rigid_bodies["id"].tolist() == [1, 2]
+    assert np.allclose(rigid_bodies["pos_z"], [0.3, 0.6])
+    assert rigid_bodies["rot_w"].tolist() == [1, 0]
+    assert np.allclose(rigid_bodies["error"], [0.001, 0.002])
+    assert rigid_bodies["tracking_valid"].tolist() == [True, False]
+
+
+def test_decodes_labeled_markers():
+    records = np.zeros(2, dtype=LABELED_MARKER_DTYPE)
+    records["id"] = [(1 << 16) | 3, 7]
+    records["pos"] = [[1, 2, 3], [4, 5, 6]]
+    records["size"] = [0.01, 0.02]
+    records["params"] = [0b000001, 0b110000]
+    records["residual"] = [0.5, 0.25]
+
+    parser = MotiveStreamDecoder(synthetic_frame(labeled_markers=records))
+    parser.parse("frame_number")
+    # marker sets, legacy markers, rigid bodies, skeletons, assets
+    parser.skip_blocks(5)
+
+    labeled_markers = parser.parse_labeled_markers()
+    assert labeled_markers["model_id"].tolist() == [1, 0]
+    assert labeled_markers["marker_id"].tolist() == [3, 7]
+    assert labeled_markers["pos_y"].tolist() == [2, 5]
+    assert labeled_markers["residual"].tolist() == [0.5, 0.25]
+    assert labeled_markers["occluded"].tolist() == [True, False]
+    assert labeled_markers["unlabeled"].tolist() == [False, True]
+    assert labeled_markers["active"].tolist() == [False, True]
+
+
+def test_decodes_the_suffix_after_the_last_block():
+    # trailing bytes after the suffix are ignored
+    packet = synthetic_frame(timestamp=1.5, stamps=(100, 200, 300)) + b"\0\0\0\0"
+    parser = MotiveStreamDecoder(packet)
+    parser.parse("frame_number")
+
+    assert parser.skip_blocks(len(FRAME_BLOCKS)) == len(FRAME_BLOCKS)
+    timing = parser.parse_suffix()
+    assert timing["timestamp"] == 1.5
+    assert (
+        timing["camera_mid_exposure"],
+        timing["camera_data_received"],
+        timing["transmit"],
+    ) == (100, 200, 300)
+    assert timing["precision_timestamp"] == 0
+    assert not timing["is_recording"] and not timing["tracked_models_changed"]
+    assert parser.remaining() == 4
+
+
+def test_truncated_suffix_is_none():
+    packet = synthetic_frame()
+    parser = MotiveStreamDecoder(packet, end=len(packet) - 1)
+    parser.parse("frame_number")
+    parser.skip_blocks(len(FRAME_BLOCKS))
+
+    assert parser.parse_suffix() is None
+
+
+def test_decodes_a_bytearray_in_place():
+    packet = synthetic_frame()
+    buffer = bytearray(len(packet) + 64)
+    buffer[: len(packet)] = packet
+    parser = MotiveStreamDecoder(buffer, 4 + 8, end=len(packet))
+
+    assert parser.startswith(b"hand\0", parser.tell())
+    parser.parse("label")
+    markers = parser.parse_markers(parser.parse("count"))
+    assert np.array_equal(markers, HAND)
+    assert not markers.flags.owndata
+
+
+def test_rejects_memoryview():
+    with pytest.raises(TypeError):
+        MotiveStreamDecoder(memoryview(synthetic_frame()))
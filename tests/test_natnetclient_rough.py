@@ -0,0 +1,75 @@
+import socket
+import time
+
+import numpy as np
+import pytest
+
+from natnetclient_rough import NatNetClient
+from SyntheticMotive import build_frame
+
+
+@pytest.fixture
+def client():
+    client = NatNetClient({"high_res_clock_frequency": 1e9})
+    client.payloads = []
+    client.markers_listener = client.payloads.append
+    return client
+
+
+def decode(client, stream_version):
+    packet = build_frame(7, [("hand", np.ones((2, 3)))], timestamp=0.5, stamps=(100, 200, 300))
+    client._NatNetClient__unpack_data(packet, 0, time.perf_counter(), stream_version=stream_version)
+    return client.payloads[-1]
+
+
+def test_timing_from_a_4_1_stream(client):
+    payload = decode(client, (4, 1, 0, 0))
+
+    assert payload["timing"]["transmit"] == 300
+    assert "camera" in client.stats()["latency_ms"]
+
+
+def test_older_streams_have_no_timing(client):
+    # before 4.1 blocks have no size to skip by, so the suffix is out of reach
+    payload = decode(client, (3, 1, 0, 0))
+
+    assert payload["label"] == "hand"
+    assert np.array_equal(payload["markers"], np.ones((2, 3)))
+    assert payload["timing"] is None
+    # only the local receive -> listener stage, no server stamp stages
+    assert list(client.stats()["latency_ms"]) == ["receive_to_listener"]
+
+
+@pytest.fixture
+def silent_server(client):
+    # a command channel whose server never replies
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(("127.0.0.1", 0))
+    client.command_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client.settings.update(
+        {
+            "server_ip": "127.0.0.1",
+            "command_port": server.getsockname()[1],
+            "server_version": [3, 1, 0, 0],
+            "description_timeout": 0.05,
+        }
+    )
+    yield client
+    client.command_socket.close()
+    server.close()
+
+
+def test_unanswered_description_requests_are_withdrawn(silent_server):
+    client = silent_server
+    client._NatNetClient__unpack_data(build_frame(1, [("hand", np.ones((2, 3)))]))
+    first = client.description_request
+    assert len(client.pending_requests) == 1
+
+    # a new asset set replaces the outstanding request
+    client._NatNetClient__unpack_data(build_frame(2, [("hand", np.ones((3, 3)))]))
+    assert first.cancelled()
+    assert len(client.pending_requests) == 1
+
+    time.sleep(0.2)
+    assert client.description_request.cancelled()
+    assert not client.pending_requests
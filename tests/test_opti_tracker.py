@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from scipy.signal import sosfilt, sosfilt_zi
+
+from FrameRingBuffer import FrameRingBuffer
+from OptiTracker import OptiTracker, StreamingButterworth, butter_sos, frame_centroids
+
+HEADER = "frame_number,marker_label,pos_x,pos_y,pos_z\n"
+
+
+def write_csv(path, n_frames, tail=""):
+    rows = [
+        f"{frame},m{marker},{frame / 1000:.3f},{marker / 1000:.3f},0.001\n"
+        for frame in range(n_frames)
+        for marker in range(2)
+    ]
+    path.write_text(HEADER + "".join(rows) + tail)
+    return str(path)
+
+
+def test_tail_excludes_partly_written_row(tmp_path):
+    # the last field is cut short but the row already has all its commas
+    data_dir = write_csv(tmp_path / "hand.csv", 2000, tail="2000,m0,2.000,0.000,0.0")
+    tracker = OptiTracker(marker_count=2, data_dir=data_dir)
+
+    frames = tracker._OptiTracker__query_frames(3)
+    assert np.unique(frames["frame_number"]).tolist() == [1997, 1998, 1999]
+    assert frames["pos_z"].tolist() == [1] * len(frames)
+
+
+def test_window_excludes_partly_written_row(tmp_path):
+    data_dir = write_csv(tmp_path / "hand.csv", 2000, tail="2000,m0,2.000,0.000,0.0")
+    tracker = OptiTracker(marker_count=2, data_dir=data_dir)
+
+    frames = tracker.window(1998, 2000)
+    assert frames["frame_number"].tolist() == [1998, 1998, 1999, 1999]
+    assert frames["pos_x"].tolist() == [1998, 1998, 1999, 1999]
+
+    frames = tracker.window(10, 12)
+    assert frames["frame_number"].tolist() == [10, 10, 11, 11, 12, 12]
+
+
+def test_first_frame_needs_a_complete_row(tmp_path):
+    data_dir = write_csv(tmp_path / "hand.csv", 0, tail="0,m0,0.000,0.0")
+    tracker = OptiTracker(marker_count=2, data_dir=data_dir, sample_rate=100)
+
+    with pytest.raises(ValueError, match="no frames"):
+        tracker.window_time(0, 1)
+
+
+def test_frame_centroids_skip_missing_markers():
+    frames = np.zeros(
+        6, dtype=[("frame_number", "i8"), ("pos_x", "f8"), ("pos_y", "f8"), ("pos_z", "f8")]
+    )
+    # frame 2 lost a marker, frame 3 has none tracked and frame 4 is out of order
+    frames["frame_number"] = [1, 1, 4, 2, 3, 4]
+    frames["pos_x"] = [1, 3, 10, 5, np.nan, 20]
+    frames["pos_y"] = [np.nan, 2, 1, 1, np.nan, 1]
+
+    means = frame_centroids(frames)
+    assert means["frame_number"].tolist() == [1, 2, 3, 4]
+    assert means["pos_x"][[0, 1, 3]].tolist() == [2, 5, 15]
+    assert means["pos_y"][[0, 1, 3]].tolist() == [2, 1, 1]
+    assert np.isnan(means["pos_x"][2]) and np.isnan(means["pos_y"][2])
+
+
+def test_frame_centroids_empty():
+    frames = np.zeros(
+        0, dtype=[("frame_number", "i8"), ("pos_x", "f8"), ("pos_y", "f8"), ("pos_z", "f8")]
+    )
+    assert len(frame_centroids(frames)) == 0
+
+
+def test_streaming_butterworth_chunks_match_one_pass():
+    positions = np.cumsum(np.random.default_rng(0).normal(size=(200, 3)), axis=0)
+
+    whole = StreamingButterworth(order=2, cutoff=10, sample_rate=120).filter(positions)
+
+    streaming = StreamingButterworth(order=2, cutoff=10, sample_rate=120)
+    chunks = [streaming.filter(positions[0])]
+    chunks += [streaming.filter(chunk) for chunk in np.split(positions[1:], [1, 8, 9, 50])]
+    chunks = np.vstack(chunks)
+
+    sos = butter_sos(2, 10, "low", 120)
+    expected, _ = sosfilt(sos, positions, axis=0, zi=sosfilt_zi(sos)[:, :, None] * positions[0])
+    assert np.allclose(whole, expected)
+    assert np.allclose(chunks, expected)
+
+
+def test_feed_stamps_frames_with_their_receive_time():
+    frame_buffer = FrameRingBuffer(capacity=4, max_markers=2)
+    try:
+        tracker = OptiTracker(marker_count=2, frame_buffer=frame_buffer)
+        tracker.feed({"frame_number": 7, "received": 12.5, "markers": np.ones((2, 3))})
+
+        frames = frame_buffer.snapshot()
+        assert frames["frame_number"].tolist() == [7]
+        assert frames["timestamp"].tolist() == [12.5]
+    finally:
+        frame_buffer.close()
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from TrialFile import POSITION_FORMATS, open_trial, pack_header, record_positions, to_records
+
+
+@pytest.mark.parametrize("position_format", sorted(POSITION_FORMATS))
+def test_round_trip(tmp_path, position_format):
+    frame_numbers = np.repeat(np.arange(10, 14), 2)
+    positions = np.random.default_rng(0).uniform(-1, 1, (8, 3))
+    records = to_records(frame_numbers, positions, POSITION_FORMATS[position_format])
+
+    path = str(tmp_path / "trial_1_left_target.bin")
+    with open(path, "wb") as file:
+        file.write(pack_header(2, 120.0, position_format))
+        file.write(records.tobytes())
+        # a record still being written
+        file.write(records[:1].tobytes()[:-2])
+
+    header, read = open_trial(path)
+    assert header["marker_count"] == 2
+    assert header["sample_rate"] == 120.0
+    assert header["dtype"] == POSITION_FORMATS[position_format]
+    assert read["frame_number"].tolist() == frame_numbers.tolist()
+
+    tolerance = 1e-6 if position_format == "int32_um" else 1e-7
+    assert np.allclose(record_positions(read), positions, atol=tolerance)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "trial.bin"
+    path.write_bytes(b"frame_number,pos_x,pos_y,pos_z\n")
+
+    with pytest.raises(ValueError):
+        open_trial(str(path))
+
+
+def test_rejects_unknown_position_format():
+    with pytest.raises(ValueError):
+        pack_header(2, 120.0, "float64")
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pytest
+
+from TrialFile import read_header
+from TrialRecorder import TrialRecorder, read_recording
+
+
+def test_recording_round_trip(tmp_path):
+    recorder = TrialRecorder(chunk_size=4, marker_count=3)
+    markers = np.arange(9, dtype=np.float32).reshape(3, 3)
+    try:
+        recorder.begin(str(tmp_path / "trial_1_left_target"))
+        for frame_number in range(5):
+            recorder.append(frame_number, markers)
+        recorder.end()
+    finally:
+        recorder.close()
+
+    records = read_recording(str(tmp_path / "trial_1_left_target.bin"))
+    assert records["frame_number"].tolist() == np.repeat(np.arange(5), 3).tolist()
+    assert np.allclose(records["pos_z"].reshape(5, 3), markers[:, 2])
+
+
+def test_marker_count_from_first_frame(tmp_path):
+    recorder = TrialRecorder()
+    try:
+        recorder.begin(str(tmp_path / "trial_1_left_target"))
+        recorder.append(0, np.zeros((4, 3)))
+        recorder.end()
+
+        # without frames the count stays unknown
+        recorder.begin(str(tmp_path / "trial_2_left_target"))
+        recorder.end()
+    finally:
+        recorder.close()
+
+    assert read_header(str(tmp_path / "trial_1_left_target.bin"))["marker_count"] == 4
+    assert read_header(str(tmp_path / "trial_2_left_target.bin"))["marker_count"] == 0
+
+
+def test_writer_error_is_raised_by_end(tmp_path):
+    recorder = TrialRecorder(chunk_size=2)
+    try:
+        recorder.begin(str(tmp_path / "missing" / "trial_1_left_target"))
+        for frame_number in range(4):
+            recorder.append(frame_number, np.zeros((1, 3)))
+        with pytest.raises(FileNotFoundError):
+            recorder.end()
+
+        # the writer survives, and the next recording is unaffected
+        path = str(tmp_path / "trial_2_left_target")
+        recorder.begin(path)
+        recorder.append(0, np.zeros((1, 3)))
+        recorder.end()
+    finally:
+        recorder.close()
+
+    assert os.path.exists(path + ".bin")
+    assert len(read_recording(path + ".bin")) == 1
+
+
+def test_close_raises_pending_error(tmp_path):
+    recorder = TrialRecorder()
+    recorder.begin(str(tmp_path / "missing" / "trial"))
+    with pytest.raises(FileNotFoundError):
+        recorder.close()